@@ -0,0 +1,136 @@
+import os
+import queue
+import threading
+import time
+
+
+# Animations that are used by more than one object, their frames are in the order the objects expect
+ANIMATIONS = {
+    "turtle": ("turtle_right_0", "turtle_right_1", "turtle_down_0", "turtle_down_1",
+               "turtle_left_0", "turtle_left_1", "turtle_up_0", "turtle_up_1"),
+    "shrimp": tuple(f"shrimp_{i}" for i in range(12)),
+    "mainmenu_cloud": ("mainmenu_cloud_0", "mainmenu_cloud_1", "mainmenu_cloud_2"),
+    "scoreboard_bg": ("scoreboard_bg_0", "scoreboard_bg_1"),
+    "vfx_bell": tuple(f"vfx_bell_{i}" for i in range(6)),
+    "vfx_dust": tuple(f"vfx_dust_{i}" for i in range(4)),
+    "vfx_star": tuple(f"vfx_star_{i}" for i in range(5)),
+}
+
+
+def manifest(folder="data"):
+    """
+    Returns the names of every GIF asset in the folder, sorted so the loading order is always the same
+    """
+    return sorted(file_name[:-4] for file_name in os.listdir(folder)
+                  if file_name.endswith(".gif") and os.path.isfile(os.path.join(folder, file_name)))
+
+
+def path_of(name):
+    """
+    Returns the path of the GIF of an asset name, e.g. "shrimp_0" -> "data/shrimp_0.gif"
+    """
+    return "data/" + name + ".gif"
+
+
+class AssetRegistry:
+    def __init__(self, backend):
+        """
+        Registers every GIF to the backend once and gives out frame tables, tuples of shape names, that are
+        shared by every sprite with the same animation
+        :param backend: Backend that the shapes are registered to
+        """
+        self._backend = backend
+        self._registered = set(backend.getshapes())
+        self._tables = {}  # Animation id or tuple of asset names -> tuple of shape names
+        self.load_times = {}  # Shape name -> milliseconds its registration took
+
+        # Background preloading, see preload
+        self._read_shapes = queue.Queue()  # (shape name, read data) tuples from the worker thread
+        self._preload_remaining = 0
+        self._preload_start = 0
+        self.preload_time = None  # Milliseconds the last preload took, None while it is running
+
+    def shape(self, name):
+        """
+        Returns the shape name of an asset, the GIF is registered the first time it is asked for
+        :param name: Asset name without the folder and the extension
+        """
+        shape_name = path_of(name)
+        if shape_name not in self._registered:
+            self.register(shape_name)
+        return shape_name
+
+    def register(self, shape_name):
+        start = time.perf_counter()
+        self._backend.register_shape(shape_name)
+        self.load_times[shape_name] = (time.perf_counter() - start) * 1000
+        self._registered.add(shape_name)
+
+    def preload(self, names, pump_interval=10, pump_budget=4):
+        """
+        Reads the GIFs on a worker thread and registers them on the Tk thread in small slices, so the game keeps
+        running smoothly while the assets are loaded. Assets asked for before they arrive are registered at once
+        :param names: Asset names, e.g. the manifest of the data folder
+        :param pump_interval: Milliseconds between the registration slices
+        :param pump_budget: Milliseconds a registration slice can take
+        """
+        shape_names = [path_of(name) for name in names if path_of(name) not in self._registered]
+        self._preload_remaining += len(shape_names)
+        self._preload_start = time.perf_counter()
+        self.preload_time = None
+        threading.Thread(target=self._read_worker, args=(shape_names,), daemon=True).start()
+        self._backend.ontimer(lambda: self._pump(pump_interval, pump_budget), pump_interval)
+
+    def _read_worker(self, shape_names):
+        for shape_name in shape_names:
+            try:
+                data = self._backend.read_shape(shape_name)
+            except OSError:
+                data = None
+            self._read_shapes.put((shape_name, data))
+
+    def _pump(self, pump_interval, pump_budget):
+        start = time.perf_counter()
+        while self._preload_remaining and (time.perf_counter() - start) * 1000 < pump_budget:
+            try:
+                shape_name, data = self._read_shapes.get_nowait()
+            except queue.Empty:
+                break
+            self._preload_remaining -= 1
+            if shape_name in self._registered:
+                continue
+            if data is None:
+                self.register(shape_name)
+            else:
+                register_start = time.perf_counter()
+                self._backend.register_read_shape(shape_name, data)
+                self.load_times[shape_name] = (time.perf_counter() - register_start) * 1000
+                self._registered.add(shape_name)
+
+        if self._preload_remaining:
+            self._backend.ontimer(lambda: self._pump(pump_interval, pump_budget), pump_interval)
+        else:
+            self.preload_time = (time.perf_counter() - self._preload_start) * 1000
+
+    def frames(self, animation):
+        """
+        Returns the shared frame table of an animation
+        :param animation: Id of an animation in ANIMATIONS, an asset name or a sequence of asset names
+        :return: Tuple of shape names, the same tuple is returned for the same animation
+        """
+        key = animation if isinstance(animation, str) else tuple(animation)
+        table = self._tables.get(key)
+        if table is None:
+            if isinstance(key, str):
+                names = ANIMATIONS.get(key, (key,))
+            else:
+                names = key
+            table = tuple(self.shape(name) for name in names)
+            self._tables[key] = table
+        return table
+
+    def total_load_time(self):
+        """
+        Returns the milliseconds spent on registering the shapes
+        """
+        return sum(self.load_times.values())
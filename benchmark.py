@@ -0,0 +1,308 @@
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from gameManagement import *
+from headless import HeadlessBackend
+import mazeGenerator
+from distanceField import DistanceField
+import game
+from leaderboard import ScoreRanking
+from pathfinding import Pathfinder
+from shrimpSchedule import plan_shrimp_schedule
+
+
+def _new_session():
+    # Every scenario gets its own headless backend, renderer and keyboard so they do not share any sprites
+    backend = HeadlessBackend(max_speed=False)
+    set_backend(backend)
+    renderer = GameRenderer(640, 640)
+    keyboard_input = KeyboardState(renderer)
+    return backend, renderer, keyboard_input
+
+
+def _level_number_of(size):
+    # main.start_new_game uses 1 + 10 * level as the level size, bigger levels are played with the rules of level 3
+    return min(3, max(1, (size - 1) // 10))
+
+
+def _new_game(size):
+    backend, renderer, keyboard_input = _new_session()
+    level = game.Game(renderer, keyboard_input, lambda: None, lambda: None)
+    level.generate_level(size, size)
+    level.initialize_game([_level_number_of(size), 1250, 0])
+    return backend, renderer, keyboard_input, level
+
+
+def _press_random_arrow(backend, rng):
+    backend.press_key(rng.choice(("Up", "Down", "Left", "Right")))
+
+
+def scenario_maze_generation(size, seed):
+    rng = random.Random(seed)
+
+    def run():
+        mazeGenerator.generate_maze(size, size, rng)
+    return run
+
+
+def scenario_generate_level(size, seed):
+    _backend, renderer, keyboard_input = _new_session()
+    level = game.Game(renderer, keyboard_input, lambda: None, lambda: None)
+
+    def run():
+        random.seed(seed)
+        level.generate_level(size, size)
+    return run
+
+
+def scenario_shrimp_placement(size, seed):
+    # Picks a spawn tile from 20 different player positions, like 20 collected shrimps
+    level = mazeGenerator.generate_maze(size, size, random.Random(seed))
+    rooms = [(x, y) for x in range(1, size, 2) for y in range(1, size, 2)]
+    positions = random.Random(seed).sample(rooms, min(20, len(rooms)))
+    creation_range = (2 + _level_number_of(size)) * 30
+    field = DistanceField(level)
+
+    def run():
+        rng = random.Random(seed)
+        for x, y in positions:
+            field.compute(x, y, creation_range)
+            field.pick_tile_at(rng.randint(1, max(1, field.max_distance)), rng)
+    return run
+
+
+def scenario_create_shrimp(size, seed):
+    # Creates 20 shrimps in the endless world, like 20 collected shrimps. Every shrimp is searched around the tile
+    # of the last one and emits its particle trail. Fixed levels only look their planned shrimps up, their
+    # planning is timed by shrimp_schedule
+    _backend, renderer, keyboard_input = _new_session()
+    level = game.Game(renderer, keyboard_input, lambda: None, lambda: None)
+    level.generate_world(seed)
+    level.initialize_game([_level_number_of(size), 1250, 0])
+    start_x, start_y = level._player.pos_x, level._player.pos_y
+    first_shrimp = level._shrimp_pos_x, level._shrimp_pos_y
+
+    def run():
+        level._shrimp_rng = random.Random(seed)
+        level._particles.rng = random.Random(seed)
+        level._player.pos_x, level._player.pos_y = start_x, start_y
+        level._shrimp_pos_x, level._shrimp_pos_y = first_shrimp
+        for _i in range(20):
+            # The player stands on the last shrimp, the trail of the new one starts from there
+            level._player.pos_x, level._player.pos_y = level._shrimp_pos_x, level._shrimp_pos_y
+            level._shrimp_creation_range = game.shrimp_creation_range_of(_level_number_of(size))
+            level.shrimp.destroy_yourself()
+            level._particles.clear()
+            level._create_shrimp()
+    return run
+
+
+def scenario_shrimp_schedule(size, seed):
+    # Plans every shrimp of a level, like initialize_game or the level pregenerator
+    level = mazeGenerator.generate_maze(size, size, random.Random(seed))
+    level_number = _level_number_of(size)
+    start_x, start_y = game.player_start_of(level_number)
+    field = DistanceField(level)
+
+    def run():
+        plan_shrimp_schedule(level, start_x, start_y, game.shrimp_creation_range_of(level_number),
+                             random.Random(seed), field)
+    return run
+
+
+def scenario_render_loop(size, seed, frames=250):
+    # The player wanders around, every frame runs the loop methods and draws the visible objects
+    random.seed(seed)
+    backend, _renderer, _keyboard_input, _level = _new_game(size)
+
+    def run():
+        rng = random.Random(seed)
+        for frame in range(frames):
+            if frame % 4 == 0:
+                _press_random_arrow(backend, rng)
+            backend.advance(20)
+    return run
+
+
+def scenario_particle_churn(size, seed, frames=250):
+    # A dust particle is spawned on every frame the player moves, on top of the star trails of new shrimps
+    random.seed(seed)
+    backend, _renderer, _keyboard_input, level = _new_game(size)
+    player = level._player
+
+    def run():
+        rng = random.Random(seed)
+        for frame in range(frames):
+            if not player._movement_route:
+                _press_random_arrow(backend, rng)
+            player._update_sprite_pos()
+            backend.advance(20)
+    return run
+
+
+def _path_queries(size, seed, count):
+    # Random pairs of rooms, every query of a target after the first one can use its cached distance field
+    level = mazeGenerator.generate_maze(size, size, random.Random(seed))
+    rng = random.Random(seed)
+    rooms = [(x, y) for x in range(1, size, 2) for y in range(1, size, 2)]
+    goal = rng.choice(rooms)
+    return Pathfinder(level), [rng.choice(rooms) for _i in range(count)], goal
+
+
+def scenario_path_bfs(size, seed, count=10):
+    pathfinder, starts, goal = _path_queries(size, seed, count)
+
+    def run():
+        for start in starts:
+            pathfinder.bfs_path(start, goal)
+    return run
+
+
+def scenario_path_astar(size, seed, count=10):
+    pathfinder, starts, goal = _path_queries(size, seed, count)
+
+    def run():
+        for start in starts:
+            pathfinder.astar_path(start, goal)
+    return run
+
+
+def scenario_path_cached(size, seed, count=10):
+    # The distance field of the goal is calculated before the measurement, like after the first query
+    pathfinder, starts, goal = _path_queries(size, seed, count)
+    pathfinder.distance_field(*goal)
+
+    def run():
+        for start in starts:
+            pathfinder.shortest_path(start, goal)
+    return run
+
+
+def scenario_score_ranking(size, seed):
+    # Size is the number of submitted scores, every submission checks if it places and then asks its percentile,
+    # like the "you beat N% of the runs" text after a game
+    rng = random.Random(seed)
+    scores = [int(rng.gauss(1500, 400)) for _i in range(size)]
+
+    def run():
+        ranking = ScoreRanking(7)
+        for score in scores:
+            if ranking.would_place(score):
+                ranking.add("", score)
+            else:
+                ranking.add(None, score)
+            ranking.percentile(score)
+        ranking.rank(scores[-1])
+    return run
+
+
+SCENARIOS = {
+    "maze_generation": (scenario_maze_generation, (11, 21, 31, 101, 301, 1001, 2001)),
+    "shrimp_placement": (scenario_shrimp_placement, (11, 21, 31, 101, 301, 1001, 2001)),
+    "generate_level": (scenario_generate_level, (11, 21, 31, 41, 101, 301, 1001)),
+    "create_shrimp": (scenario_create_shrimp, (11, 21, 31, 41, 101, 301, 1001)),
+    "shrimp_schedule": (scenario_shrimp_schedule, (11, 21, 31, 41, 101, 301, 1001)),
+    "render_loop": (scenario_render_loop, (11, 21, 31, 41, 101, 301, 1001)),
+    "particle_churn": (scenario_particle_churn, (11, 21, 31, 41, 101, 301, 1001)),
+    "score_ranking": (scenario_score_ranking, (10000, 100000, 1000000)),
+    "path_bfs": (scenario_path_bfs, (31, 101, 301, 1001)),
+    "path_astar": (scenario_path_astar, (31, 101, 301, 1001)),
+    "path_cached": (scenario_path_cached, (31, 101, 301, 1001)),
+}
+
+
+def measure(scenario, size, seed, repeat=3):
+    """
+    Runs a scenario and measures it. Time is the best of the repeats, memory is measured in a separate run
+    because tracemalloc slows the code down
+    :param scenario: Function that prepares the scenario and returns the function to be measured
+    :param size: Level size
+    :param seed: Seed of the random number generators
+    :param repeat: Number of timed runs
+    :return: Dictionary of the results
+    """
+    best = None
+    for _i in range(repeat):
+        run = scenario(size, seed)
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    run = scenario(size, seed)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    run()
+    after = tracemalloc.take_snapshot()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated_blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+
+    return {"seconds": best, "peak_bytes": peak, "allocated_blocks": allocated_blocks}
+
+
+def run_benchmarks(scenario_names=None, sizes=None, seed=0, repeat=3):
+    """
+    Runs the benchmarks and returns the results in a JSON friendly dictionary
+    :param scenario_names: Names of the scenarios to run, all of them if None
+    :param sizes: Level sizes to run the scenarios with, the default sizes of each scenario if None
+    :param seed: Seed of the random number generators
+    :param repeat: Number of timed runs of every measurement
+    """
+    results = []
+    for name in scenario_names or SCENARIOS:
+        scenario, default_sizes = SCENARIOS[name]
+        for size in sizes or default_sizes:
+            result = {"scenario": name, "size": size}
+            result.update(measure(scenario, size, seed, repeat))
+            results.append(result)
+            print(f"{name:>18} {size:>5}: {result['seconds'] * 1000:10.2f} ms {result['peak_bytes'] / 1024:10.0f} KiB "
+                  f"peak {result['allocated_blocks']:>9} blocks")
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": results,
+    }
+
+
+def compare(old_data, new_data):
+    """
+    Prints how much faster every scenario got compared to an older run
+    """
+    old_results = {(r["scenario"], r["size"]): r for r in old_data["results"]}
+    for result in new_data["results"]:
+        old = old_results.get((result["scenario"], result["size"]))
+        if old:
+            print(f"{result['scenario']:>18} {result['size']:>5}: {old['seconds'] / result['seconds']:6.2f}x speed "
+                  f"{old['peak_bytes'] / max(1, result['peak_bytes']):6.2f}x less peak memory")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures level generation, shrimp placement, rendering, "
+                                                 "particles, score ranking and pathfinding")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS))
+    parser.add_argument("--sizes", nargs="+", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Saves the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an older run to compare with")
+    args = parser.parse_args()
+
+    data = run_benchmarks(args.scenarios, args.sizes, args.seed, args.repeat)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(data, output_file, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as compare_file:
+            compare(json.load(compare_file), data)
@@ -0,0 +1,145 @@
+import random
+from collections import OrderedDict
+
+from levelGrid import LevelGrid
+
+
+class ChunkedMaze:
+    def __init__(self, seed, chunk_size=16, max_chunks=64, world_chunks=65536):
+        """
+        Maze that is generated chunk by chunk when its tiles are looked at, so the world can be as big as wanted.
+        Every chunk is generated from the seed and its position only, so a chunk that is dropped and generated again
+        is the same and the seams between chunks always match. It has the width, height and tile_at of a LevelGrid
+        :param seed: Seed of the world
+        :param chunk_size: Width and height of a chunk in tiles, an even number
+        :param max_chunks: Number of chunks kept in memory, the least recently used ones are dropped
+        :param world_chunks: Width and height of the world in chunks
+        """
+        if chunk_size % 2 or chunk_size < 4:
+            raise ValueError(f"Chunk size must be an even number of at least 4, got {chunk_size}")
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.width = self.height = chunk_size * world_chunks
+
+        self._chunks = OrderedDict()  # (chunk x, chunk y) -> (tiles, water variants), least recently used first
+        self.generated_chunks = 0
+        self.evicted_chunks = 0
+
+    def chunk(self, chunk_x, chunk_y):
+        """
+        Returns the (tiles, water variants) tuple of a chunk, both have chunk_size * chunk_size bytes with
+        the indexing of a LevelGrid of the chunk. The chunk is generated if it is not in memory
+        """
+        key = (chunk_x, chunk_y)
+        chunk = self._chunks.get(key)
+        if chunk is not None:
+            self._chunks.move_to_end(key)
+            return chunk
+
+        chunk = self._generate_chunk(chunk_x, chunk_y)
+        self.generated_chunks += 1
+        self._chunks[key] = chunk
+        while len(self._chunks) > self.max_chunks:
+            self._chunks.popitem(last=False)
+            self.evicted_chunks += 1
+        return chunk
+
+    def tile_at(self, x, y):
+        """
+        Returns the tile number at x, y; if there is no tile returns 1
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            size = self.chunk_size
+            return self.chunk(x // size, y // size)[0][(x % size) * size + y % size]
+        return 1
+
+    def water_at(self, x, y):
+        """
+        Returns the tile_water_N variant at x, y
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            size = self.chunk_size
+            return self.chunk(x // size, y // size)[1][(x % size) * size + y % size]
+        return 0
+
+    def ensure_around(self, x, y, radius):
+        """
+        Generates the chunks that have tiles closer than radius to x, y and marks them as recently used,
+        call it every frame with the player's position so the chunks are ready before they are seen
+        """
+        size = self.chunk_size
+        for chunk_x in range(max(0, (x - radius) // size), (x + radius) // size + 1):
+            for chunk_y in range(max(0, (y - radius) // size), (y + radius) // size + 1):
+                self.chunk(chunk_x, chunk_y)
+
+    def region(self, x, y, width, height):
+        """
+        Reads a rectangle of the world, e.g. the area a shrimp can be placed in
+        :return: LevelGrid of the rectangle, tiles out of the world are walls
+        """
+        cells = bytearray(width * height)
+        i = 0
+        for tile_x in range(x, x + width):
+            for tile_y in range(y, y + height):
+                cells[i] = self.tile_at(tile_x, tile_y)
+                i += 1
+        return LevelGrid(width, height, cells)
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def _generate_chunk(self, chunk_x, chunk_y):
+        size = self.chunk_size
+        rooms = size // 2
+        rng = random.Random(f"{self.seed}/chunk/{chunk_x}/{chunk_y}")
+        tiles = bytearray(b"\x01") * (size * size)
+
+        # Rooms are on the odd tiles like in mazeGenerator. Eller's algorithm carves the rooms row by row
+        # keeping only the sets of the current row, every set reaches the next row at least once and
+        # the last row joins every set left, so the chunk is a perfect maze
+        sets = list(range(rooms))
+        next_set = rooms
+        for row in range(rooms):
+            tile_y = 2 * row + 1
+            for i in range(rooms):
+                tiles[(2 * i + 1) * size + tile_y] = 0
+
+            # Joining neighbours of different sets
+            last_row = row == rooms - 1
+            for i in range(rooms - 1):
+                if sets[i] != sets[i + 1] and (last_row or rng.random() < 0.5):
+                    tiles[(2 * i + 2) * size + tile_y] = 0
+                    old_set = sets[i + 1]
+                    sets = [sets[i] if s == old_set else s for s in sets]
+            if last_row:
+                break
+
+            # Every set goes down at least once, the rooms that do not go down start new sets
+            members = {}
+            for i, s in enumerate(sets):
+                members.setdefault(s, []).append(i)
+            next_sets = [-1] * rooms
+            for s, cells in members.items():
+                down = [i for i in cells if rng.random() < 0.4] or [rng.choice(cells)]
+                for i in down:
+                    tiles[(2 * i + 1) * size + tile_y + 1] = 0
+                    next_sets[i] = s
+            for i in range(rooms):
+                if next_sets[i] == -1:
+                    next_sets[i] = next_set
+                    next_set += 1
+            sets = next_sets
+
+        # Doors to the chunks on the left and below. The seams are the first column and row of the chunk,
+        # so every seam belongs to one chunk and the door never depends on the order the chunks are generated in
+        if chunk_x > 0:
+            tiles[2 * rng.randrange(rooms) + 1] = 0
+        if chunk_y > 0:
+            tiles[(2 * rng.randrange(rooms) + 1) * size] = 0
+
+        water_variants = rng.randbytes(size * size).translate(_LOWEST_BIT_TABLE)
+        return bytes(tiles), water_variants
+
+
+_LOWEST_BIT_TABLE = bytes(i & 1 for i in range(256))
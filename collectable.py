@@ -11,11 +11,8 @@ class Shrimp:
         """
         self._renderer = renderer
 
-        self._sprite = GameSprite(["shrimp_0", "shrimp_1", "shrimp_2", "shrimp_3", "shrimp_4",
-                                   "shrimp_5", "shrimp_6", "shrimp_7", "shrimp_8", "shrimp_9",
-                                   "shrimp_10", "shrimp_11"], 9, pos_x * 64 - 320, pos_y * 64 - 320)
+        self._sprite = GameSprite("shrimp", 9, pos_x * 64 - 320, pos_y * 64 - 320)
         self._renderer.register_object(self._sprite)
-        self._renderer.sort_sprites_by_layer()
 
         self._renderer.register_method(self._animation_update)
 
@@ -0,0 +1,144 @@
+import random
+from array import array
+
+
+def padded_walls(level):
+    """
+    Returns the tiles of a level as bytes, the tile at x, y is at x * height + y and 1 is a wall.
+    The last column is padded with walls so the neighbours of an edge tile never go out of range
+    """
+    return level.to_bytes() + b"\x01" * level.height
+
+
+def open_neighbours(walls, height, b):
+    """
+    Returns the indexes of the accessible neighbours of the tile at index b of padded_walls
+    """
+    return [n for n in (b + height, b - height, b + 1, b - 1) if walls[n] != 1]
+
+
+class DistanceField:
+    def __init__(self, level):
+        """
+        Walking distances from a source tile to every accessible tile of a level, found with a breadth-first search.
+        The buffers are allocated once and reused by every computation, the level is never copied
+        :param level: LevelGrid to search in
+        """
+        self._width = level.width
+        self._height = level.height
+        tile_count = level.width * level.height
+
+        self._walls = padded_walls(level)
+        self._distances = array("i", [-1]) * tile_count
+        self._queue = array("i", [0]) * tile_count
+        self._visited_count = 0
+
+        # Tiles are discovered in order of distance, so the queue is sorted by distance and
+        # the tiles at distance d are queue[self._layer_starts[d]:self._layer_starts[d + 1]]
+        self._layer_starts = [0, 0]
+        self._source = None
+        self._limit = None
+
+        self.max_distance = 0
+
+    def compute(self, x, y, limit=None):
+        """
+        Calculates the distances from x, y. Nothing is recalculated if the source and the limit are the same as before,
+        a search from the same source with a farther limit goes on from where the last one stopped
+        :param x: X position of the source tile
+        :param y: Y position of the source tile
+        :param limit: If given, the search stops at this distance and farther tiles are left undiscovered
+        """
+        source = x * self._height + y
+        if source == self._source and limit == self._limit:
+            return
+
+        h = self._height
+        walls = self._walls
+        distances = self._distances
+        queue = self._queue
+
+        if source == self._source and self._limit is not None and (limit is None or limit > self._limit):
+            # The tiles at the last limit were discovered but not searched from, so the search starts with them
+            layer_starts = self._layer_starts[:-1]
+            head = layer_starts[-1] if self.max_distance == self._limit else self._visited_count
+            tail = self._visited_count
+        else:
+            # Only the tiles discovered by the previous search are reset
+            for i in range(self._visited_count):
+                distances[queue[i]] = -1
+
+            distances[source] = 0
+            queue[0] = source
+            head = 0
+            tail = 1
+            layer_starts = [0]
+        while head < tail:
+            b = queue[head]
+            d = distances[b]
+            if d == len(layer_starts):
+                layer_starts.append(head)
+            head += 1
+
+            if limit is not None and d >= limit:
+                continue
+            d += 1
+            # Same as open_neighbours, it is written out because this is the hot loop of the search
+            for n in (b + h, b - h, b + 1, b - 1):
+                if walls[n] != 1 and distances[n] < 0:
+                    distances[n] = d
+                    queue[tail] = n
+                    tail += 1
+
+        layer_starts.append(tail)
+        self._layer_starts = layer_starts
+        self._visited_count = tail
+        self._source = source
+        self._limit = limit
+        self.max_distance = len(layer_starts) - 2
+
+    def distance_at(self, x, y):
+        """
+        Returns the distance of the tile at x, y; if it is not accessible or not discovered returns -1
+        """
+        if 0 <= x < self._width and 0 <= y < self._height:
+            return self._distances[x * self._height + y]
+        return -1
+
+    def path_from(self, x, y):
+        """
+        Returns a shortest path from x, y to the source by walking to a closer neighbour at every step
+        :return: List of (x, y) tiles from x, y to the source, None if x, y was not discovered
+        """
+        if self.distance_at(x, y) < 0:
+            return None
+        h = self._height
+        distances = self._distances
+        b = x * h + y
+        path = [(x, y)]
+        d = distances[b]
+        while d > 0:
+            for n in (b + h, b - h, b + 1, b - 1):
+                if distances[n] == d - 1:
+                    b = n
+                    break
+            d -= 1
+            path.append(divmod(b, h))
+        return path
+
+    def tile_count_at(self, distance):
+        if 0 <= distance <= self.max_distance:
+            return self._layer_starts[distance + 1] - self._layer_starts[distance]
+        return 0
+
+    def pick_tile_at(self, distance, rng=random):
+        """
+        Picks a random tile at the given distance in constant time
+        :param distance: Distance of the tile from the source
+        :param rng: Random number generator, random module or a random.Random object
+        :return: (x, y) of the tile or None if there is no tile at that distance
+        """
+        count = self.tile_count_at(distance)
+        if count == 0:
+            return None
+        return divmod(self._queue[self._layer_starts[distance] + int(rng.random() * count)], self._height)
@@ -0,0 +1,108 @@
+import json
+import time
+from collections import deque
+
+
+class FrameProfiler:
+    def __init__(self, frame_budget=20, history=250):
+        """
+        Measures how long every loop method and every drawing phase of a frame takes
+        :param frame_budget: Milliseconds a frame can take, longer frames are counted as dropped
+        :param history: Number of recent frames kept for the percentiles and the dump
+        """
+        self.frame_budget = frame_budget
+        self.frame_count = 0
+        self.dropped_frames = 0
+
+        self._frame_times = deque(maxlen=history)
+        self._frames = deque(maxlen=history)  # Recent frames as (frame time, {phase: time}) tuples
+        self._callbacks = {}  # Name -> [calls, total time, longest time]
+        self._phases = {}  # Name -> total time
+
+        self._frame_start = 0
+        self._phase_start = 0
+        self._current_phases = {}
+
+    def begin_frame(self):
+        self._frame_start = self._phase_start = time.perf_counter()
+        self._current_phases = {}
+
+    def time_callback(self, method, loop_number):
+        """
+        Calls a loop method and adds its duration to the statistics of its name
+        """
+        start = time.perf_counter()
+        method(loop_number)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        name = _name_of(method)
+        stats = self._callbacks.get(name)
+        if stats is None:
+            self._callbacks[name] = [1, elapsed, elapsed]
+        else:
+            stats[0] += 1
+            stats[1] += elapsed
+            if elapsed > stats[2]:
+                stats[2] = elapsed
+
+    def end_phase(self, name):
+        """
+        Ends the current phase of the frame, the next phase starts immediately
+        """
+        now = time.perf_counter()
+        elapsed = (now - self._phase_start) * 1000
+        self._phase_start = now
+        self._current_phases[name] = self._current_phases.get(name, 0) + elapsed
+        self._phases[name] = self._phases.get(name, 0) + elapsed
+
+    def end_frame(self):
+        frame_time = (time.perf_counter() - self._frame_start) * 1000
+        self.frame_count += 1
+        if frame_time > self.frame_budget:
+            self.dropped_frames += 1
+        self._frame_times.append(frame_time)
+        self._frames.append((frame_time, self._current_phases))
+
+    def percentile(self, percent):
+        """
+        Returns the frame time in milliseconds that the given percent of the recent frames do not exceed
+        """
+        if not self._frame_times:
+            return 0
+        frame_times = sorted(self._frame_times)
+        return frame_times[min(len(frame_times) - 1, int(len(frame_times) * percent / 100))]
+
+    def overlay_text(self):
+        return f"p50 {self.percentile(50):.1f} ms  p95 {self.percentile(95):.1f} ms  " \
+               f"p99 {self.percentile(99):.1f} ms  dropped {self.dropped_frames}/{self.frame_count}"
+
+    def summary(self):
+        """
+        Returns the statistics in a JSON friendly dictionary
+        """
+        frames = max(1, self.frame_count)
+        return {
+            "frames": self.frame_count,
+            "dropped_frames": self.dropped_frames,
+            "frame_budget_ms": self.frame_budget,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "phases_mean_ms": {name: total / frames for name, total in self._phases.items()},
+            "callbacks": {name: {"calls": calls, "total_ms": total, "mean_ms": total / calls, "max_ms": longest}
+                          for name, (calls, total, longest) in
+                          sorted(self._callbacks.items(), key=lambda x: x[1][1], reverse=True)},
+            "recent_frames": [{"frame_ms": frame_time, "phases_ms": phases} for frame_time, phases in self._frames],
+        }
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as dump_file:
+            json.dump(self.summary(), dump_file, indent=2)
+
+
+def _name_of(method):
+    # Bound methods are named after the class of their object, so every particle type gets its own line
+    owner = getattr(method, "__self__", None)
+    if owner is not None:
+        return f"{type(owner).__name__}.{method.__name__}"
+    return getattr(method, "__qualname__", repr(method))
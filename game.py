@@ -1,33 +1,59 @@
 import math
 from player import Player
 from gameManagement import *
+import chunkedMaze
 import collectable
+from distanceField import DistanceField
+import mazeFormat
+import mazeGenerator
 import particles
+from pathfinding import Pathfinder, PathHint
 import random
+from shrimpSchedule import plan_shrimp_schedule
+from tileView import TileView
 
 
 class Game:
-    def __init__(self, renderer, keyboard_input, win_method, lose_method):
+    def __init__(self, renderer, keyboard_input, win_method, lose_method, level_cache=None):
         """
         Creates a game that contains elements of gameplay like player and level
         :param renderer: GameRenderer object
         :param keyboard_input: KeyboardInput object
         :param win_method: The method that will be called if the player manages to collect all shrimps
         :param lose_method: The method that will be called if the player runs out of time
+        :param level_cache: LevelCache that levels with a given seed are loaded from and saved to
         """
-        self._level = []
+        self._level = None
+        self._water_variants = None
+        self._level_cache = level_cache
+        self.seed = None
+        self._shrimp_rng = random
+        self._distance_field = None
         self._game_variables = []
         self._renderer = renderer
+        self._key_input = keyboard_input
         self._win_method = win_method
         self._lose_method = lose_method
 
-        self._player = Player(renderer, keyboard_input, self._player_moved)
+        self._particles = particles.ParticleSystem(renderer)
+        self._player = Player(renderer, keyboard_input, self._player_moved, self._particles)
         self._player.sprite.hidden = True
 
-        self._tiles = []
+        self._tile_view = None
+        self._wall_masks = None
+        self._world_mode = False
+        self._mapped_level = None  # MappedLevel of a level that is played from a file
+        self._mapped_window = None  # (x, y, LevelGrid, water variants, wall masks) of the tiles read around the camera
+        self._plan_shrimps = False  # The shrimps of a level of fixed size in memory are planned when it starts
+        self._path_hint = None
+        self.show_hint = False  # Shows the way to the shrimp, toggled with the H key
 
         self._frames_since_collection = 0
         self._shrimp_creation_range = 0
+        self._shrimp_schedule = None
+        self._next_shrimp = 0
+        self._shrimp_pos_x = -1
+        self._shrimp_pos_y = -1
         self.shrimp = None
 
         self._transition_in_progress = False
@@ -35,20 +61,32 @@ class Game:
 
     def initialize_game(self, variables):
 
-        self._player.pos_x = variables[0] * 6 - 1
-        self._player.pos_y = variables[0] * 6 - 1
-        self._player.sprite.pos_x = variables[0] * 384 - 384
-        self._player.sprite.pos_y = variables[0] * 384 - 384
+        self._player.pos_x, self._player.pos_y = player_start_of(variables[0])
+        if self._mapped_level:
+            # A saved maze can be smaller than the levels of the level number, the start is kept in its last room
+            self._player.pos_x = min(self._player.pos_x, _last_room_of(self._level.width))
+            self._player.pos_y = min(self._player.pos_y, _last_room_of(self._level.height))
+        self._player.set_sprite_position(self._player.pos_x * 64 - 320, self._player.pos_y * 64 - 320)
         self._player.sprite.hidden = False
         self._renderer.register_method(self._player.update)
-        self._renderer.sort_sprites_by_layer()
+        self._renderer.register_draw_method(self._player.interpolate)
+        self._renderer.register_draw_method(self._tile_view.refresh)
 
         self._game_variables = variables
 
         self._create_ui()
         self._renderer.register_method(self._update_ui_texts)
-
-        self._shrimp_creation_range = (2 + variables[0]) * 30
+        if self._path_hint:
+            self._renderer.register_method(self._update_path_hint)
+
+        self._shrimp_creation_range = shrimp_creation_range_of(variables[0])
+        if self._plan_shrimps:
+            # Every shrimp of the level is placed now, unless the level was pregenerated with them
+            start = (self._player.pos_x, self._player.pos_y, self._shrimp_creation_range)
+            if self._shrimp_schedule is None or not self._shrimp_schedule.matches(*start):
+                self._shrimp_schedule = plan_shrimp_schedule(self._level, *start, self._shrimp_rng,
+                                                             self._distance_field)
+            self._next_shrimp = 0
         self._create_shrimp()
 
     def _create_ui(self):
@@ -88,125 +126,204 @@ class Game:
             self._renderer.unregister_method(self._update_ui_texts)
             SceneTransition(self._renderer).exit_transition(self._terminate_level, self._lose_method)
 
-    def generate_level(self, level_width, level_height):
+    def _update_path_hint(self, _loop_number):
+        if self._key_input.pressed_hint:
+            self._key_input.pressed_hint = False
+            self.show_hint = not self.show_hint
+
+        if self.show_hint and self.shrimp:
+            self._path_hint.show((self._player.pos_x, self._player.pos_y), (self._shrimp_pos_x, self._shrimp_pos_y))
+        else:
+            self._path_hint.hide()
+
+    def generate_level(self, level_width, level_height, seed=None, level_data=None):
         """
         Generates a randomly generated level
         :param level_width: Number of units in width
         :param level_height: Number of units in height
+        :param seed: Seed of the level, the same seed always gives the same level. A random seed is used if None,
+        levels of given seeds are saved to the level cache
+        :param level_data: (LevelGrid, water variants, wall masks, ShrimpSchedule or None) tuple of the seed
+        if it is already generated, e.g. by a LevelPregenerator
+        """
+        # Carving a perfect maze so every corner of the level is accessible
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        wall_masks = None
+        self._shrimp_schedule = None
+        if level_data is not None:
+            self._level, self._water_variants, wall_masks, self._shrimp_schedule = level_data
+        elif seed is not None and self._level_cache:
+            self._level, self._water_variants = self._level_cache.load_or_generate(level_width, level_height, seed)
+        else:
+            self._level, self._water_variants = mazeGenerator.generate_level_data(level_width, level_height,
+                                                                                  self.seed)
+        self._distance_field = DistanceField(self._level)
+        self._shrimp_rng = mazeGenerator.rng_stream(self.seed, "shrimp")
+        self._particles.rng = mazeGenerator.rng_stream(self.seed, "particles")
+
+        # The neighbours of every wall are found in one pass, the tile sprites are made only for the screen
+        self._wall_masks = wall_masks if wall_masks is not None else self._level.wall_masks()
+        if self._tile_view:
+            self._tile_view.destroy_yourself()
+        self._tile_view = TileView(self._renderer, self._level_tile_shape)
+        self._path_hint = PathHint(self._renderer, Pathfinder(self._level))
+        self._player.level_data = self._level
+        self._plan_shrimps = True
+
+    def load_level(self, path):
+        """
+        Plays a level saved with save_level. The file is read through mmap, the moves of the player look up single
+        tiles and the screen reads the tiles around the camera with MappedLevel.region, so the level can be much
+        bigger than the memory. Like in an endless world, the shrimps are searched around the player
+        :param path: Path of a bit-packed maze file
         """
-        # Creating a grill shape
-        for x in range(level_width):
-            level_column = []
-            for y in range(level_height):
-                tile_index = 1 if (y % 2 == 0 or x % 2 == 0) else 3  # 1: wall 0: accessible empty 3: inaccessible empty
-                if x == 1 and y == 1:
-                    tile_index = 0
-                level_column.append(tile_index)
-            self._level.append(level_column)
-
-        # Editing the level until the every corner of the level is accessible
-        number_of_inaccessible = 99
-        while number_of_inaccessible > 0:
-            # Saving the coordinates of the walls that are between an accessible and inaccessible tile
-            walls_to_be_destroyed = []
-            for tx in range(1, level_width):
-                for ty in range(1, level_height):
-                    if (tx + ty) % 2 == 1:
-                        if self._return_tile_at(tx + 1, ty) + self._return_tile_at(tx - 1, ty) == 3 \
-                                or self._return_tile_at(tx, ty + 1) + self._return_tile_at(tx, ty - 1) == 3:
-                            walls_to_be_destroyed.append((tx, ty))
-
-            # Deleting a random wall that is between an accessible and inaccessible tile
-            if len(walls_to_be_destroyed) > 0:
-                random_wall_pos = walls_to_be_destroyed[random.randint(0, len(walls_to_be_destroyed) - 1)]
-                self._level[random_wall_pos[0]][random_wall_pos[1]] = 0
-                if random_wall_pos[0] % 2 == 0:
-                    self._level[random_wall_pos[0] + 1][random_wall_pos[1]] = 0
-                    self._level[random_wall_pos[0] - 1][random_wall_pos[1]] = 0
-                else:
-                    self._level[random_wall_pos[0]][random_wall_pos[1] + 1] = 0
-                    self._level[random_wall_pos[0]][random_wall_pos[1] - 1] = 0
-
-            # Counting the inaccessible tiles, the loop continues if the count is not zero
-            number_of_inaccessible = 0
-            for tx in range(level_width):
-                for ty in range(level_height):
-                    number_of_inaccessible += 1 if self._level[tx][ty] == 3 else 0
-
-        # Creating wall sprites
-        for x in range(level_width):
-            sprite_column = []
-            for y in range(level_height):
-                # Creating the sprite
-                if self._level[x][y] == 1:
-                    sprite_name = "tile_wall_" + str(self._return_tile_at(x, y + 1) + self._return_tile_at(x - 1, y)
-                                                     * 2 + self._return_tile_at(x + 1, y)
-                                                     * 8 + self._return_tile_at(x, y - 1) * 4)
-                else:
-                    sprite_name = "tile_water_" + str(random.randint(0, 1))
-
-                sprite_column.append(GameSprite([sprite_name], -1, x * 64 - 320, y * 64 - 320))
-                self._renderer.register_object(sprite_column[y])
-            self._tiles.append(sprite_column)
+        self._mapped_level = mazeFormat.open_level(path)
+        self._level = self._mapped_level
+        seed = self._mapped_level.metadata.get("seed")
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self._shrimp_rng = mazeGenerator.rng_stream(self.seed, "shrimp")
+        self._particles.rng = mazeGenerator.rng_stream(self.seed, "particles")
         self._player.level_data = self._level
+        self._tile_view = TileView(self._renderer, self._mapped_tile_shape)
+
+    def generate_world(self, seed=None, chunk_size=16):
+        """
+        Creates an endless world instead of a level of fixed size. Its chunks are generated when the player comes
+        close to them and dropped when they are far away, so it costs the same however far the player goes
+        :param seed: Seed of the world, a random seed is used if None
+        :param chunk_size: Width and height of a chunk in tiles
+        """
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self._world_mode = True
+        self._level = chunkedMaze.ChunkedMaze(self.seed, chunk_size)
+        self._shrimp_rng = mazeGenerator.rng_stream(self.seed, "shrimp")
+        self._particles.rng = mazeGenerator.rng_stream(self.seed, "particles")
+        self._player.level_data = self._level
+        self._tile_view = TileView(self._renderer, self._world_tile_shape)
+        self._renderer.register_method(self._stream_world)
+
+    def _stream_world(self, _loop_number):
+        # Chunks are generated a little before they are seen
+        pos_x = self._player.pos_x
+        pos_y = self._player.pos_y
+        self._level.ensure_around(pos_x, pos_y, 12)
+
+    def _level_tile_shape(self, x, y):
+        # Asset name of a tile of a level of fixed size, there are no tiles out of the level
+        if 0 <= x < self._level.width and 0 <= y < self._level.height:
+            tile_index = self._level.index(x, y)
+            if self._level.cells[tile_index] == 1:
+                return _WALL_NAMES[self._wall_masks[tile_index]]
+            return _WATER_NAMES[self._water_variants[tile_index]]
+        return None
+
+    def _mapped_tile_shape(self, x, y):
+        # Asset name of a tile of a mapped level. The tiles are read a window at a time, with a border for the
+        # neighbours of the walls at its edges, and a new window is read around the tile when it is outside
+        level = self._level
+        if not (0 <= x < level.width and 0 <= y < level.height):
+            return None
+        window = self._mapped_window
+        if window is None or not (window[0] < x < window[0] + _MAPPED_WINDOW_SIZE - 1
+                                  and window[1] < y < window[1] + _MAPPED_WINDOW_SIZE - 1):
+            origin_x = x - _MAPPED_WINDOW_SIZE // 2
+            origin_y = y - _MAPPED_WINDOW_SIZE // 2
+            area, water_variants = level.region(origin_x, origin_y, _MAPPED_WINDOW_SIZE, _MAPPED_WINDOW_SIZE)
+            window = self._mapped_window = (origin_x, origin_y, area, water_variants, area.wall_masks())
+
+        origin_x, origin_y, area, water_variants, wall_masks = window
+        tile_index = area.index(x - origin_x, y - origin_y)
+        if area.cells[tile_index] == 1:
+            return _WALL_NAMES[wall_masks[tile_index]]
+        return _WATER_NAMES[water_variants[tile_index]]
+
+    def _world_tile_shape(self, x, y):
+        # Asset name of a tile of the world, the neighbours of a wall can be in the other chunks
+        level = self._level
+        if not (0 <= x < level.width and 0 <= y < level.height):
+            return None
+        if level.tile_at(x, y) == 1:
+            # Same neighbour bits as LevelGrid.wall_masks
+            return _WALL_NAMES[(level.tile_at(x, y + 1) == 1) | (level.tile_at(x - 1, y) == 1) << 1
+                               | (level.tile_at(x, y - 1) == 1) << 2 | (level.tile_at(x + 1, y) == 1) << 3]
+        return _WATER_NAMES[level.water_at(x, y)]
+
+    def _shrimp_search_area(self):
+        # Returns a distance field from the player and the position of its bottom left corner in the level.
+        # An endless world or a mapped level is not in memory, so its shrimps are not planned beforehand and
+        # only a square around the player is searched
+        # The border walls are one tile farther than the range, so every tile in the range can be reached
+        radius = min(self._shrimp_creation_range, 40) + 1
+        origin_x = max(0, self._player.pos_x - radius)
+        origin_y = max(0, self._player.pos_y - radius)
+        size = 2 * radius + 1
+        area = self._level.region(origin_x, origin_y, size, size)
+        if self._mapped_level:
+            area = area[0]
+        # The search needs walls around the area, like the walls around a level
+        for i in range(size):
+            area.set_tile(i, 0, 1)
+            area.set_tile(i, size - 1, 1)
+            area.set_tile(0, i, 1)
+            area.set_tile(size - 1, i, 1)
+        distance_field = DistanceField(area)
+        distance_field.compute(self._player.pos_x - origin_x, self._player.pos_y - origin_y,
+                               self._shrimp_creation_range)
+        return distance_field, origin_x, origin_y
+
+    def save_level(self, path):
+        """
+        Saves the level in the bit-packed maze format, it can be opened with mazeFormat.open_level
+        :param path: Path of the file
+        """
+        if self._world_mode:
+            raise ValueError("An endless world can not be saved, only a level of fixed size")
+        if self._mapped_level:
+            raise ValueError("The level is already a maze file")
+        mazeFormat.save_level(path, self._level, self._water_variants,
+                              {"seed": self.seed, "algorithm": mazeGenerator.ALGORITHM})
 
     def _create_shrimp(self):
-        # Selecting a random but fair position for shrimp to spawn at
-        shrimp_creation_map = list(map(lambda col: list(map(lambda x: -x, col)), self._level))
-        latest_discoveries = [(self._player.pos_x, self._player.pos_y)]
-        shrimp_creation_map[self._player.pos_x][self._player.pos_y] = 1
-        highest_distance = 1
-        while len(latest_discoveries) > 0:
-            bx = latest_discoveries[0][0]
-            by = latest_discoveries[0][1]
-            if shrimp_creation_map[bx + 1][by] == 0:
-                latest_discoveries.append((bx + 1, by))
-                shrimp_creation_map[bx + 1][by] = shrimp_creation_map[bx][by] + 1
-                if shrimp_creation_map[bx][by] + 1 > highest_distance:
-                    highest_distance = shrimp_creation_map[bx][by] + 1
-            if shrimp_creation_map[bx - 1][by] == 0:
-                latest_discoveries.append((bx - 1, by))
-                shrimp_creation_map[bx - 1][by] = shrimp_creation_map[bx][by] + 1
-                if shrimp_creation_map[bx][by] + 1 > highest_distance:
-                    highest_distance = shrimp_creation_map[bx][by] + 1
-            if shrimp_creation_map[bx][by + 1] == 0:
-                latest_discoveries.append((bx, by + 1))
-                shrimp_creation_map[bx][by + 1] = shrimp_creation_map[bx][by] + 1
-                if shrimp_creation_map[bx][by] + 1 > highest_distance:
-                    highest_distance = shrimp_creation_map[bx][by] + 1
-            if shrimp_creation_map[bx][by - 1] == 0:
-                latest_discoveries.append((bx, by - 1))
-                shrimp_creation_map[bx][by - 1] = shrimp_creation_map[bx][by] + 1
-                if shrimp_creation_map[bx][by] + 1 > highest_distance:
-                    highest_distance = shrimp_creation_map[bx][by] + 1
-            latest_discoveries.pop(0)
-
-        max_dist = min(highest_distance, self._shrimp_creation_range + 1)
-        if max(2, max_dist // 2) < max_dist:
-            desired_shrimp_distance = random.randint(max(2, max_dist // 2), max_dist)
+        # Returns False if there is no tile for a shrimp
+        if not self._plan_shrimps:
+            # Selecting a random but fair position with the same rules as plan_shrimp_schedule
+            distance_field, origin_x, origin_y = self._shrimp_search_area()
+            max_dist = min(distance_field.max_distance + 1, self._shrimp_creation_range + 1)
+            if max(2, max_dist // 2) < max_dist:
+                desired_shrimp_distance = self._shrimp_rng.randint(max(2, max_dist // 2), max_dist)
+            else:
+                desired_shrimp_distance = 2
+            tile = distance_field.pick_tile_at(desired_shrimp_distance - 1, self._shrimp_rng)
+            if tile is None:
+                # Only the player's tile can be reached
+                return False
+            self._shrimp_pos_x = origin_x + tile[0]
+            self._shrimp_pos_y = origin_y + tile[1]
+            score_value = (desired_shrimp_distance - 1) * 4
         else:
-            desired_shrimp_distance = 2
-        for _x in range(len(shrimp_creation_map)):
-            for _y in range(len(shrimp_creation_map)):
-                if shrimp_creation_map[_x][_y] == desired_shrimp_distance:
-                    self._shrimp_pos_x = _x
-                    self._shrimp_pos_y = _y
+            # The shrimps of a level were planned when it started, so the next one is only looked up
+            if self._next_shrimp >= len(self._shrimp_schedule):
+                return False
+            self._shrimp_pos_x, self._shrimp_pos_y, score_value = self._shrimp_schedule[self._next_shrimp]
+            self._next_shrimp += 1
 
         # Creating the collectable shrimp object
         self.shrimp = collectable.Shrimp(self._renderer, self._shrimp_pos_x, self._shrimp_pos_y)
-        self.shrimp.score_value = (desired_shrimp_distance - 1) * 4
+        self.shrimp.score_value = score_value
 
-        self._shrimp_creation_range -= desired_shrimp_distance - 1
+        self._shrimp_creation_range -= score_value // 4
 
         # Creating particles
+        rng = self._particles.rng
         particles_length = int(math.sqrt((self._shrimp_pos_x - self._player.pos_x) ** 2
                                          + (self._shrimp_pos_y - self._player.pos_y) ** 2) * 2)
         for t in range(particles_length):
-            pos_x = random.randint(-16, 16) + (self._player.pos_x + (self._shrimp_pos_x - self._player.pos_x)
-                                               * (t / particles_length)) * 64 - 320
-            pos_y = random.randint(-16, 16) + (self._player.pos_y + (self._shrimp_pos_y - self._player.pos_y)
-                                               * (t / particles_length)) * 64 - 320
-            particles.StarParticles(self._renderer, pos_x, pos_y).speed = random.randint(3, 8)
+            pos_x = rng.randint(-16, 16) + (self._player.pos_x + (self._shrimp_pos_x - self._player.pos_x)
+                                            * (t / particles_length)) * 64 - 320
+            pos_y = rng.randint(-16, 16) + (self._player.pos_y + (self._shrimp_pos_y - self._player.pos_y)
+                                            * (t / particles_length)) * 64 - 320
+            self._particles.emit(particles.STAR_PARTICLES, pos_x, pos_y, rng.randint(3, 8))
+        return True
 
     def _player_moved(self):
         if self._player.pos_x == self._shrimp_pos_x and self._player.pos_y == self._shrimp_pos_y:
@@ -216,11 +333,9 @@ class Game:
             self.shrimp.destroy_yourself()
             self.shrimp = None
 
-            particles.ShrimpParticles(self._renderer, self._shrimp_pos_x * 64 - 320, self._shrimp_pos_y * 64 - 320)
+            self._particles.emit(particles.SHRIMP_PARTICLES, self._shrimp_pos_x * 64 - 320, self._shrimp_pos_y * 64 - 320)
 
-            if self._shrimp_creation_range > 0:
-                self._create_shrimp()
-            else:
+            if self._shrimp_creation_range <= 0 or not self._create_shrimp():
                 self._shrimp_pos_x = -1
                 self._shrimp_pos_y = -1
 
@@ -230,24 +345,49 @@ class Game:
                     self._renderer.unregister_method(self._update_ui_texts)
                     SceneTransition(self._renderer).exit_transition(self._terminate_level, self._win_method)
 
-    def _return_tile_at(self, x, y):
-        # Returns the tile number at x, y; if there is no tile returns 1
-        if -1 < x < len(self._level) and -1 < y < len(self._level):
-            return self._level[x][y]
-        else:
-            return 1
-
     def _terminate_level(self):
         # Unregistering objects and methods
         self._renderer.unregister_method(self._player.update)
+        self._renderer.unregister_draw_method(self._player.interpolate)
 
         self._renderer.unregister_object(self._player.sprite)
         self._renderer.unregister_object(self._ui_level)
         self._renderer.unregister_object(self._ui_score)
         self._renderer.unregister_object(self._ui_time)
-        for tiles_col in self._tiles:
-            for t in tiles_col:
-                self._renderer.unregister_object(t)
+        self._renderer.unregister_draw_method(self._tile_view.refresh)
+        self._tile_view.destroy_yourself()
+        self._particles.destroy_yourself()
+        if self._path_hint:
+            self._renderer.unregister_method(self._update_path_hint)
+            self._path_hint.hide()
+        if self._world_mode:
+            self._renderer.unregister_method(self._stream_world)
+        if self._mapped_level:
+            self._mapped_level.close()
 
         if self.shrimp:
             self.shrimp.destroy_yourself()
+
+
+def player_start_of(level_number):
+    """
+    Returns the (x, y) tile the player starts the level at
+    """
+    return level_number * 6 - 1, level_number * 6 - 1
+
+
+def shrimp_creation_range_of(level_number):
+    """
+    Returns the sum of the shrimp distances of the level, the level ends when it is spent
+    """
+    return (2 + level_number) * 30
+
+
+def _last_room_of(size):
+    # Rooms are on the odd tiles and the last tile is a wall
+    return size - 2 if size % 2 else size - 3
+
+
+_MAPPED_WINDOW_SIZE = 32  # Width and height of the windows of a mapped level that are read for the screen
+_WALL_NAMES = tuple(f"tile_wall_{i}" for i in range(16))
+_WATER_NAMES = ("tile_water_0", "tile_water_1")
@@ -1,30 +1,238 @@
+import bisect
 import math
-import turtle
 import random
+import time
+from collections import deque
+from assets import AssetRegistry
+from renderBackends import TurtleBackend
+from frameProfiler import FrameProfiler
+from leaderboard import LeaderboardStore, ScoreRanking
+
+
+SIMULATION_STEP = 20  # Milliseconds of a simulation step, the game runs at 50 steps per second
+MAX_CATCH_UP_STEPS = 5  # A late frame runs at most this many simulation steps
+KEY_REPEAT_INTERVAL = 30  # Milliseconds, a press of the same key sooner than this after the last one is key repeat
+
+_backend = None
+_assets = None
+
+
+def set_backend(backend):
+    """
+    Sets the backend used for the window, timers, images and keyboard. Call it before creating any game object
+    :param backend: TurtleBackend, HeadlessBackend or an object with the same methods
+    """
+    global _backend, _assets
+    _backend = backend
+    _assets = None
+
+
+def get_backend():
+    """
+    Returns the current backend, a TurtleBackend is created if no backend is set
+    """
+    global _backend
+    if _backend is None:
+        _backend = TurtleBackend()
+    return _backend
+
+
+def get_assets():
+    """
+    Returns the AssetRegistry of the current backend
+    """
+    global _assets
+    if _assets is None:
+        _assets = AssetRegistry(get_backend())
+    return _assets
 
 
 class GameSprite:
     def __init__(self, sprites, sorting_layer, pos_x, pos_y):
         """
         A 2D texture that is going to be rendered on the screen
-        :param sprites: List of names of sprites
+        :param sprites: Id of an animation in assets.ANIMATIONS, name of a sprite or list of names of sprites
         :param sorting_layer: Determines its sorting relative to the other sprites, higher the closer
         :param pos_x: X position of sprite
         :param pos_y: Y position of sprite
         """
-        self.sprites = sprites
+        self._render_bucket = None  # Layer bucket of the RenderList while the sprite is registered
+        self._render_order = 0  # Registration number given by the RenderList
+        self._spatial_index = None  # SpatialIndex of the renderer while the sprite is registered
+        self._spatial_cell = None
+
+        self.sprites = get_assets().frames(sprites)  # Frame table shared with the other sprites of the animation
         self.frame = 0
         self.layer = sorting_layer
-        self.pos_x = pos_x
-        self.pos_y = pos_y
+        self._pos_x = pos_x
+        self._pos_y = pos_y
         self.hidden = False
-        self.alwaysDraw = False
-
-        existing_shapes = turtle.getshapes()
-        for i in range(len(sprites)):
-            sprites[i] = "data/" + sprites[i] + ".gif"
-            if sprites[i] not in existing_shapes:
-                turtle.register_shape(sprites[i])
+        self._always_draw = False
+
+    @property
+    def pos_x(self):
+        return self._pos_x
+
+    @pos_x.setter
+    def pos_x(self, value):
+        self._pos_x = value
+        if self._spatial_index is not None:
+            self._spatial_index.move(self)
+
+    @property
+    def pos_y(self):
+        return self._pos_y
+
+    @pos_y.setter
+    def pos_y(self, value):
+        self._pos_y = value
+        if self._spatial_index is not None:
+            self._spatial_index.move(self)
+
+    @property
+    def alwaysDraw(self):
+        return self._always_draw
+
+    @alwaysDraw.setter
+    def alwaysDraw(self, value):
+        # Sprites that are always drawn are kept out of the grid cells
+        spatial_index = self._spatial_index
+        if spatial_index is not None:
+            spatial_index.remove(self)
+        self._always_draw = value
+        if spatial_index is not None:
+            spatial_index.insert(self)
+
+
+class SpatialIndex:
+    def __init__(self, cell_size=128):
+        """
+        Uniform grid of sprites, lets the renderer find the sprites around the camera without checking every sprite.
+        The sprites of a cell are kept in buckets of their sorting layers, so a query is already grouped by layer
+        :param cell_size: Width and height of a cell in pixels
+        """
+        self._cell_size = cell_size
+        self._cells = {}  # (cell x, cell y) -> layer -> dict of sprites, dicts are used as insertion ordered sets
+        self._always_drawn = {}  # Layer -> dict of sprites
+
+    def _cell_of(self, sprite):
+        return int(sprite.pos_x // self._cell_size), int(sprite.pos_y // self._cell_size)
+
+    @staticmethod
+    def _add_to(layers, sprite):
+        layers.setdefault(sprite.layer, {})[sprite] = None
+
+    @staticmethod
+    def _remove_from(layers, sprite):
+        # Returns True if no sprite is left in the layers
+        bucket = layers.get(sprite.layer)
+        if bucket is not None:
+            bucket.pop(sprite, None)
+            if not bucket:
+                del layers[sprite.layer]
+        return not layers
+
+    def insert(self, sprite):
+        sprite._spatial_index = self
+        if sprite.alwaysDraw:
+            sprite._spatial_cell = None
+            self._add_to(self._always_drawn, sprite)
+        else:
+            sprite._spatial_cell = self._cell_of(sprite)
+            self._add_to(self._cells.setdefault(sprite._spatial_cell, {}), sprite)
+
+    def remove(self, sprite):
+        if sprite._spatial_cell is None:
+            self._remove_from(self._always_drawn, sprite)
+        elif self._remove_from(self._cells[sprite._spatial_cell], sprite):
+            del self._cells[sprite._spatial_cell]
+        sprite._spatial_index = None
+        sprite._spatial_cell = None
+
+    def move(self, sprite):
+        """
+        Moves the sprite to its new cell, it is called by the sprite when its position changes
+        """
+        if sprite._spatial_cell is None:
+            return
+        new_cell = self._cell_of(sprite)
+        if new_cell != sprite._spatial_cell:
+            if self._remove_from(self._cells[sprite._spatial_cell], sprite):
+                del self._cells[sprite._spatial_cell]
+            sprite._spatial_cell = new_cell
+            self._add_to(self._cells.setdefault(new_cell, {}), sprite)
+
+    def query(self, min_x, min_y, max_x, max_y):
+        """
+        Returns the sprites in the cells that overlap the rectangle and the sprites that are always drawn,
+        in the order of their layers and then of their registration
+        """
+        found = {}  # Layer -> list of sprites
+        for layer, sprites in self._always_drawn.items():
+            found[layer] = list(sprites)
+        cells = self._cells
+        for cx in range(int(min_x // self._cell_size), int(max_x // self._cell_size) + 1):
+            for cy in range(int(min_y // self._cell_size), int(max_y // self._cell_size) + 1):
+                cell = cells.get((cx, cy))
+                if cell:
+                    for layer, sprites in cell.items():
+                        layer_sprites = found.get(layer)
+                        if layer_sprites is None:
+                            found[layer] = list(sprites)
+                        else:
+                            layer_sprites.extend(sprites)
+
+        # Only the few sprites of a layer that came from more than one cell are put back in registration order
+        result = []
+        for layer in sorted(found):
+            layer_sprites = found[layer]
+            if len(layer_sprites) > 1:
+                layer_sprites.sort(key=_registration_order)
+            result.extend(layer_sprites)
+        return result
+
+
+def _registration_order(sprite):
+    return sprite._render_order
+
+
+class RenderList:
+    def __init__(self):
+        """
+        Registered sprites in drawing order. Sprites are kept in buckets of their sorting layers, a bucket keeps
+        the registration order. Every sprite holds its bucket as a handle, so adding and removing are O(1)
+        and the order never has to be sorted again
+        """
+        self._layers = []  # Sorted layer values
+        self._buckets = {}  # Layer -> dict of sprites, dicts are used as insertion ordered sets
+        self._count = 0
+        self._next_order = 0  # Registration number of the next sprite, sprites of a layer are in this order
+
+    def add(self, sprite):
+        bucket = self._buckets.get(sprite.layer)
+        if bucket is None:
+            bisect.insort(self._layers, sprite.layer)
+            bucket = self._buckets[sprite.layer] = {}
+        bucket[sprite] = None
+        sprite._render_bucket = bucket
+        sprite._render_order = self._next_order
+        self._next_order += 1
+        self._count += 1
+
+    def remove(self, sprite):
+        del sprite._render_bucket[sprite]
+        sprite._render_bucket = None
+        self._count -= 1
+
+    def __contains__(self, sprite):
+        return sprite._render_bucket is not None and sprite in sprite._render_bucket
+
+    def __iter__(self):
+        for layer in self._layers:
+            yield from self._buckets[layer]
+
+    def __len__(self):
+        return self._count
 
 
 class UiText:
@@ -52,31 +260,44 @@ class UiText:
 
 
 class GameRenderer:
-    def __init__(self, screen_width, screen_height):
+    def __init__(self, screen_width, screen_height, retained_mode=True):
         """
         Renders the game with 50 fps
         :param screen_width: Width of the screen
         :param screen_height: Height of the screen
+        :param retained_mode: If True, canvas items are kept and only changed when their objects change,
+        otherwise every item is deleted and drawn again every frame
         """
         # Setting up the screen
-        self._screen = turtle.Screen()
-        self._screen.setup(640, 640, None, None)
-        self._screen.title("Caretta the Labyrinth Explorer")
-        self._screen._root.resizable(False, False)
-        self._screen._root.iconbitmap("data/game_icon.ico")
-
-        # Setting up the turtle
-        self._turtleObject = turtle.Turtle()
-        self._turtleObject.hideturtle()
-        self._turtleObject.penup()
-        self._screen.tracer(0, 0)
+        self._backend = get_backend()
+        self._backend.open_window("Caretta the Labyrinth Explorer", screen_width, screen_height, "data/game_icon.ico")
+        self._draw = self._backend.create_draw(retained_mode)
+        self.canvas_operations = 0  # Number of canvas operations in the last frame
 
         # Defining lists
-        self._gameSprites = []
-        self._uiTexts = []
+        self._gameSprites = RenderList()
+        self._spatial_index = SpatialIndex()
+        self._uiTexts = {}  # Dictionary is used as an insertion ordered set
+        self._batches = []  # Objects that draw many images at once, sorted by their layers
         self._loopMethods = []
 
+        # Frame profiler, see enable_profiler
+        self._profiler = None
+        self._profiler_overlay = None
+        self._profiler_dump_path = None
+
+        # Fixed time step: the loop methods are called 50 times per simulated second whatever the frame rate is
+        self._drawMethods = []
         self._loop_number = 0
+        self._last_frame_time = self._backend.now()
+        self._next_frame_time = self._last_frame_time
+        self._simulation_time = SIMULATION_STEP  # The first frame runs a step immediately
+        self._frame_jitters = deque(maxlen=250)
+        self.timings = {}  # Metric name -> milliseconds of every measurement, see measure_until_next_frame
+        self._pending_timings = []
+        self.input = None  # KeyboardState that is drained before every simulation step
+        self.pacing = {"frames": 0, "steps": 0, "catch_up_steps": 0, "skipped_steps": 0, "late_frames": 0,
+                       "max_jitter_ms": 0}
 
         self.offset_x = 0
         self.offset_y = 0
@@ -86,51 +307,186 @@ class GameRenderer:
         self._render_loop()
 
     def _render_loop(self):
-        # Clears the screen before the drawing
-        self._turtleObject.clear()
+        now = self._backend.now()
+        profiler = self._profiler
+        if profiler:
+            profiler.begin_frame()
+
+        # Frames are scheduled on an ideal timeline, the difference from it is the jitter of this frame
+        self._record_frame_timing(now - self._next_frame_time)
+
+        # Runs as many fixed simulation steps as the time passed since the last frame, a late frame catches up
+        self._simulation_time += now - self._last_frame_time
+        self._last_frame_time = now
+        steps = 0
+        while self._simulation_time >= SIMULATION_STEP and steps < MAX_CATCH_UP_STEPS:
+            self._simulation_time -= SIMULATION_STEP
+            steps += 1
+            # A catch-up step gets the presses until the time it ends, the last step of the frame gets the rest
+            if self._simulation_time >= SIMULATION_STEP and steps < MAX_CATCH_UP_STEPS:
+                self._simulation_step(profiler, now - self._simulation_time)
+            else:
+                self._simulation_step(profiler)
+        if self._simulation_time >= SIMULATION_STEP:
+            # The game is too far behind, the rest of the time is skipped instead of freezing the screen
+            self.pacing["skipped_steps"] += int(self._simulation_time // SIMULATION_STEP)
+            self._simulation_time %= SIMULATION_STEP
+        self.pacing["steps"] += steps
+        if steps > 1:
+            self.pacing["catch_up_steps"] += steps - 1
+        if profiler:
+            profiler.end_phase("callbacks")
+
+        self._draw_frame(self._simulation_time / SIMULATION_STEP, profiler)
+
+        # The next frame is due one step after the ideal time of this frame, so the work of a frame does not
+        # push the following frames back. If the frame is very late, the timeline starts again from now
+        self._next_frame_time += SIMULATION_STEP
+        if self._next_frame_time < now - SIMULATION_STEP * MAX_CATCH_UP_STEPS:
+            self._next_frame_time = now + SIMULATION_STEP
+        self._backend.ontimer(self._render_loop, max(0, int(round(self._next_frame_time - self._backend.now()))))
+
+    def _simulation_step(self, profiler, end_time=None):
+        # The key presses since the last step until the end of this step are given to this step
+        if self.input:
+            self.input.drain(end_time)
 
         # Calls every loop methods
-        for m in self._loopMethods:
-            m(self._loop_number)
+        if profiler:
+            for m in self._loopMethods:
+                profiler.time_callback(m, self._loop_number)
+        else:
+            for m in self._loopMethods:
+                m(self._loop_number)
 
-        # Draws all the sprites in the list
-        for sprite in self._gameSprites:
+        self._loop_number += 1
+
+    def _draw_frame(self, alpha, profiler):
+        # Starts the frame, immediate mode clears the screen before the drawing
+        self._draw.begin_frame()
+
+        # Lets the objects place their sprites between the last two simulation steps
+        for m in self._drawMethods:
+            m(alpha)
+
+        # Draws the sprites around the camera. The spatial index gives them in the order of the layers and then
+        # of the registration, so only the sprites near the camera are walked
+        visible_sprites = self._spatial_index.query(-360 - self.offset_x, -360 - self.offset_y,
+                                                    360 - self.offset_x, 360 - self.offset_y)
+        render_list = self._gameSprites
+        batches = self._batches
+        next_batch = 0
+        for sprite in visible_sprites:
+            if sprite not in render_list:
+                continue
+            # Batches are drawn on top of the sprites of their layer
+            while next_batch < len(batches) and batches[next_batch].layer < sprite.layer:
+                batches[next_batch].draw_batch(self._draw, self.offset_x, self.offset_y)
+                next_batch += 1
             sprite_visible = sprite.alwaysDraw or \
                              (abs(sprite.pos_x + self.offset_x) < 360 and abs(sprite.pos_y + self.offset_y) < 360)
             if not sprite.hidden and sprite_visible:
-                self._turtleObject.shape(sprite.sprites[sprite.frame])
-                self._turtleObject.setposition(sprite.pos_x + self.offset_x, sprite.pos_y + self.offset_y)
-                self._turtleObject.stamp()
+                self._draw.draw_image(sprite, sprite.layer, sprite.sprites[sprite.frame],
+                                      sprite.pos_x + self.offset_x, sprite.pos_y + self.offset_y)
+        for batch in batches[next_batch:]:
+            batch.draw_batch(self._draw, self.offset_x, self.offset_y)
+        if profiler:
+            profiler.end_phase("sprites")
+
+            # The overlay is refreshed a few times a second so it can be read
+            if self._profiler_overlay and profiler.frame_count % 25 == 0:
+                self._profiler_overlay.content = profiler.overlay_text()
 
         # Writes all the sprites in the list
         for text in self._uiTexts:
             if not text.hidden:
-                self._turtleObject.pencolor(text.color)
-                self._turtleObject.setposition(text.pos_x, text.pos_y)
-                self._turtleObject.write(text.content, False, text.align, (text.font, text.size, text.style))
+                self._draw.draw_text(text, text.content, text.color, (text.font, text.size, text.style),
+                                     text.align, text.pos_x, text.pos_y)
+        if profiler:
+            profiler.end_phase("texts")
 
         # Draws a black screen with a circular hole in it for transitions
         if self.show_transition:
-            self._turtleObject.pensize(64)
-            self._turtleObject.pencolor("black")
-            for lyr in range((self.transition_radius + 32) // 15, 61):
-                self._turtleObject.setposition(64 * lyr, 0)
-                self._turtleObject.pendown()
-                for t in range(21):
-                    self._turtleObject.setposition(math.cos(math.pi * t / 10) * 15 * lyr,
-                                                   math.sin(math.pi * t / 10) * 15 * lyr)
-                self._turtleObject.penup()
+            self._draw.draw_transition(self.transition_radius)
+        if profiler:
+            profiler.end_phase("transition")
+
+        self._draw.end_frame()
+        self.canvas_operations = self._draw.operations
+
+        if self._pending_timings:
+            now = time.perf_counter()
+            backend_now = self._backend.now()
+            for name, start, backend_clock in self._pending_timings:
+                milliseconds = backend_now - start if backend_clock else (now - start) * 1000
+                self.timings.setdefault(name, []).append(milliseconds)
+            self._pending_timings = []
+
+        if profiler:
+            profiler.end_phase("canvas")
+            profiler.end_frame()
+            if self._profiler_dump_path and profiler.frame_count % 250 == 0:
+                profiler.dump(self._profiler_dump_path)
+
+    def _record_frame_timing(self, lateness):
+        self.pacing["frames"] += 1
+        jitter = abs(lateness)
+        self._frame_jitters.append(jitter)
+        if jitter > self.pacing["max_jitter_ms"]:
+            self.pacing["max_jitter_ms"] = jitter
+        if lateness > SIMULATION_STEP / 2:
+            self.pacing["late_frames"] += 1
+
+    def measure_until_next_frame(self, name, start, backend_clock=False):
+        """
+        Measures the wall clock time from start until the end of the next drawn frame, e.g. time to first frame
+        :param name: Name of the metric in timings
+        :param start: Start time from time.perf_counter()
+        :param backend_clock: If True, start is a time of the backend's clock in milliseconds, e.g. the time of
+        a key press
+        """
+        self._pending_timings.append((name, start, backend_clock))
 
-        self._loop_number += 1
+    def pacing_stats(self):
+        """
+        Returns the frame pacing statistics: frames, simulation steps, catch up and skipped steps,
+        frames later than half a step, mean jitter of the recent frames and the largest jitter in milliseconds
+        """
+        stats = dict(self.pacing)
+        stats["mean_jitter_ms"] = sum(self._frame_jitters) / len(self._frame_jitters) if self._frame_jitters else 0
+        return stats
 
-        # This function is called again after 20 ms
-        self._screen.ontimer(self._render_loop, 20)
+    def enable_profiler(self, overlay=False, dump_path=None):
+        """
+        Starts measuring the time of every loop method and drawing phase of the frames
+        :param overlay: If True, frame time percentiles and dropped frames are shown at the bottom of the screen
+        :param dump_path: If given, the statistics are saved to this JSON file every 250 frames
+        :return: FrameProfiler object
+        """
+        self._profiler = FrameProfiler()
+        self._profiler_dump_path = dump_path
+        if overlay and not self._profiler_overlay:
+            self._profiler_overlay = UiText("", "#FF001A", "Courier", 10, "normal", "left", -310, -310)
+            self.register_object(self._profiler_overlay)
+        return self._profiler
+
+    def disable_profiler(self):
+        """
+        Stops measuring and saves the statistics if a dump path was given
+        """
+        if self._profiler and self._profiler_dump_path:
+            self._profiler.dump(self._profiler_dump_path)
+        if self._profiler_overlay:
+            self.unregister_object(self._profiler_overlay)
+        self._profiler = None
+        self._profiler_overlay = None
+        self._profiler_dump_path = None
 
     def keep_window_open(self):
         """
         Prevents screen from closing. Put this at the end of the script
         """
-        self._screen.mainloop()
+        self._backend.mainloop()
 
     def register_method(self, method):
         """
@@ -147,15 +503,52 @@ class GameRenderer:
         if method in self._loopMethods:
             self._loopMethods.remove(method)
 
+    def register_draw_method(self, method):
+        """
+        Adds a method that is called before every drawing with the progress between the last two
+        simulation steps, from 0 to 1, so it can interpolate the positions of its sprites
+        :param method: Method to be registered
+        """
+        self._drawMethods.append(method)
+
+    def unregister_draw_method(self, method):
+        """
+        Deletes the method from the list
+        :param method: Method that will no longer be called
+        """
+        if method in self._drawMethods:
+            self._drawMethods.remove(method)
+
+    def register_batch(self, batch):
+        """
+        Adds an object that draws many images with a single call, like a particle system
+        :param batch: Object with a layer attribute and a draw_batch(draw, offset_x, offset_y) method that draws
+        its images with draw.draw_image, keys of the images must stay the same from frame to frame
+        """
+        bisect.insort(self._batches, batch, key=lambda x: x.layer)
+
+    def unregister_batch(self, batch, keys=()):
+        """
+        Removes the batch
+        :param batch: Batch that will no longer be drawn
+        :param keys: Keys of the images the batch has drawn, their canvas items are deleted
+        """
+        if batch in self._batches:
+            self._batches.remove(batch)
+        for key in keys:
+            self._draw.forget(key)
+
     def register_object(self, obj):
         """
         Adds object to the rendering list
         :param obj: GameSprite or UiText
         """
         if isinstance(obj, GameSprite):
-            self._gameSprites.append(obj)
+            if obj._render_bucket is None:
+                self._gameSprites.add(obj)
+                self._spatial_index.insert(obj)
         elif isinstance(obj, UiText):
-            self._uiTexts.append(obj)
+            self._uiTexts[obj] = None
         else:
             raise ValueError(f"Registered object is {obj} must be a GameSprite or UiText")
 
@@ -164,137 +557,210 @@ class GameRenderer:
         Removes object from the rendering list
         :param obj: GameSprite or UiText
         """
-        if obj in self._gameSprites:
-            self._gameSprites.remove(obj)
+        if isinstance(obj, GameSprite):
+            if obj._render_bucket is not None:
+                self._gameSprites.remove(obj)
+                self._spatial_index.remove(obj)
+                self._draw.forget(obj)
         elif obj in self._uiTexts:
-            self._uiTexts.remove(obj)
+            del self._uiTexts[obj]
+            self._draw.forget(obj)
 
     def sort_sprites_by_layer(self):
         """
-        Sorts sprites by their sorting layer. As the layer value increases, sprite comes forward
+        Sprites are always kept in the order of their sorting layers, as the layer value increases, sprite comes
+        forward. Nothing has to be sorted anymore, the method is kept for the older scenes
         """
-        self._gameSprites = sorted(self._gameSprites, key=lambda x: x.layer)
 
     def change_bg_color(self, new_color):
         """
         Changes background color
         :param new_color: New color to be applied on background
         """
-        self._screen.bgcolor(new_color)
+        self._backend.bgcolor(new_color)
 
     def get_text_input(self, title, text):
-        return self._screen.textinput(title, text)
+        return self._backend.textinput(title, text)
 
 
 class SceneTransition:
     def __init__(self, renderer):
         self._renderer = renderer
         self._exit_methods = []
+        self._finished = False
+
+    def _finish(self, method, *exit_methods):
+        # The transition is called while the renderer walks its loop methods, so the method is unregistered and
+        # the exit methods are called by a timer after the simulation step
+        self._finished = True
+        self._renderer.show_transition = False
+
+        def finish_later():
+            self._renderer.unregister_method(method)
+            for m in exit_methods:
+                m()
+        get_backend().ontimer(finish_later, 0)
 
-    def _increase_transition_rad(self):
+    def _increase_transition_rad(self, _loop_number=0):
+        if self._finished:
+            return
         self._renderer.transition_radius += self._renderer.transition_radius // 20 + 15
         if self._renderer.transition_radius >= 906:
-            self._renderer.show_transition = False
-        else:
-            turtle.ontimer(self._increase_transition_rad, 20)
+            self._finish(self._increase_transition_rad)
 
-    def _decrease_transition_rad(self):
+    def _decrease_transition_rad(self, _loop_number=0):
+        if self._finished:
+            return
         self._renderer.transition_radius -= self._renderer.transition_radius // 20 + 15
         if self._renderer.transition_radius <= 0:
-            self._renderer.show_transition = False
-            for m in self._exit_methods:
-                m()
-        else:
-            turtle.ontimer(self._decrease_transition_rad, 20)
+            self._finish(self._decrease_transition_rad, *self._exit_methods)
 
     def entrance_transition(self):
+        # The radius changes once immediately and then every simulation step
         self._renderer.transition_radius = 0
         self._renderer.show_transition = True
         self._increase_transition_rad()
+        self._renderer.register_method(self._increase_transition_rad)
 
     def exit_transition(self, *methods):
         self._renderer.transition_radius = 906
         self._renderer.show_transition = True
-        self._decrease_transition_rad()
         for m in methods:
             self._exit_methods.append(m)
+        self._decrease_transition_rad()
+        self._renderer.register_method(self._decrease_transition_rad)
 
 
 class KeyboardState:
-    def __init__(self):
+    def __init__(self, renderer=None, capacity=64):
         """
-        Allows you to get buttons pressed in the last frame
+        Queues the key presses with their times and gives the presses of every simulation step at once,
+        so no press is lost or seen twice however many keys are pressed in a frame
+        :param renderer: GameRenderer that drains the queue at the start of every simulation step,
+        drain has to be called by hand if None
+        :param capacity: Number of presses the queue holds, the oldest ones are dropped when it is full
         """
+        self._queue = deque(maxlen=capacity)  # Ring buffer of (time in milliseconds, key name) tuples
+        self.events = []  # (time in milliseconds, key name) of the presses of the current simulation step
+        self.dropped_events = 0  # Presses that fell out of the full queue
+        self.coalesced_events = 0  # Presses merged into an earlier press of the same key as key repeat
+        self._last_press_times = {}  # Key name -> time of its last press that was not merged
+
+        # The keys pressed in the current simulation step, they are kept until the next drain
         self.pressed_up = False
         self.pressed_down = False
         self.pressed_right = False
         self.pressed_left = False
         self.pressed_enter = False
+        self.pressed_hint = False
 
-        turtle.onkey(self._up_pressed, "Up")
-        turtle.onkey(self._down_pressed, "Down")
-        turtle.onkey(self._right_pressed, "Right")
-        turtle.onkey(self._left_pressed, "Left")
-        turtle.onkey(self._enter_pressed, "Return")
+        backend = get_backend()
+        backend.onkey(self._up_pressed, "Up")
+        backend.onkey(self._down_pressed, "Down")
+        backend.onkey(self._right_pressed, "Right")
+        backend.onkey(self._left_pressed, "Left")
+        backend.onkey(self._enter_pressed, "Return")
+        backend.onkey(self._hint_pressed, "h")
 
-        turtle.listen()
+        backend.listen()
+        if renderer:
+            renderer.input = self
 
     def _up_pressed(self, *args):
-        self.pressed_up = True
-        turtle.ontimer(self._reset_pressed_keys, 20)
+        self._queue_key("up")
 
     def _down_pressed(self, *args):
-        self.pressed_down = True
-        turtle.ontimer(self._reset_pressed_keys, 20)
+        self._queue_key("down")
 
     def _right_pressed(self, *args):
-        self.pressed_right = True
-        turtle.ontimer(self._reset_pressed_keys, 20)
+        self._queue_key("right")
 
     def _left_pressed(self, *args):
-        self.pressed_left = True
-        turtle.ontimer(self._reset_pressed_keys, 20)
+        self._queue_key("left")
 
     def _enter_pressed(self, *args):
-        self.pressed_enter = True
-        turtle.ontimer(self._reset_pressed_keys, 20)
+        self._queue_key("enter")
 
-    def _reset_pressed_keys(self):
-        self.pressed_up = False
-        self.pressed_down = False
-        self.pressed_right = False
-        self.pressed_left = False
-        self.pressed_enter = False
+    def _hint_pressed(self, *args):
+        self._queue_key("hint")
+
+    def _queue_key(self, key):
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped_events += 1
+        self._queue.append((get_backend().now(), key))
+
+    def drain(self, until=None):
+        """
+        Takes the presses queued since the last drain into events and sets the pressed flags, it is called
+        once per simulation step. A key pressed again within KEY_REPEAT_INTERVAL is key repeat, so it counts once
+        :param until: Time in milliseconds, the later presses are left in the queue for the next step, all if None
+        :return: List of (time in milliseconds, key name) tuples in the order the keys were pressed
+        """
+        events = []
+        keys = set()
+        last_press_times = self._last_press_times
+        while self._queue and (until is None or self._queue[0][0] < until):
+            timestamp, key = self._queue.popleft()
+            last_time = last_press_times.get(key)
+            if last_time is not None and timestamp - last_time < KEY_REPEAT_INTERVAL:
+                self.coalesced_events += 1
+                continue
+            last_press_times[key] = timestamp
+            keys.add(key)
+            events.append((timestamp, key))
+        self.events = events
+
+        self.pressed_up = "up" in keys
+        self.pressed_down = "down" in keys
+        self.pressed_right = "right" in keys
+        self.pressed_left = "left" in keys
+        self.pressed_enter = "enter" in keys
+        self.pressed_hint = "hint" in keys
+        return events
 
 
 class Scoreboard:
-    def __init__(self):
+    def __init__(self, store=None, size=7):
         """
         Scoreboard saves and show the high scores in (name, score) format
+        :param store: LeaderboardStore that keeps the scores, the one in the data folder if None
+        :param size: Number of high scores that are shown
         """
-        data_readable = open("data/scoredata", "r")
-
-        read_data = data_readable.read().split("\n")
-        names = list(map(lambda x: x, read_data[0::2]))
-        scores = list(map(lambda x: int(x), read_data[1::2]))
-        bool_list = [False for i in range(len(scores))]
-        self._scoreboard = list(zip(names, scores, bool_list))
+        self._store = store if store else LeaderboardStore()
+        self._size = size
+        self._added_ids = set()  # Scores added by this scoreboard are highlighted
+        self._ranking = ScoreRanking(size, [(name, score) for _id, name, score in self._store.top(size)])
 
     def get_scores(self):
-        return self._scoreboard
+        """
+        Returns the high scores as (name, score, added recently) tuples
+        """
+        return [(name, score, row_id in self._added_ids) for row_id, name, score in self._store.top(self._size)]
 
     def add_score(self, name, score):
         name = "".join(filter(lambda x: ord(x) > 31, name))  # Removing unreadable characters from the name
-        self._scoreboard.append((name, score, True))  # 3rd bool indicates that this element is added recently
-        self._scoreboard.sort(key=lambda x: x[1], reverse=True)
+        self._added_ids.add(self._store.add(name, score))
+        self._ranking.add(name, score)
 
-    def update_score_data(self):
-        while len(self._scoreboard) > 7:
-            self._scoreboard.pop(-1)
+    def would_place(self, score):
+        """
+        Returns True if the score would be one of the shown high scores
+        """
+        return self._ranking.would_place(score)
+
+    def rank_of(self, score):
+        """
+        Returns the place the score would get among every saved score, 1 is the best
+        """
+        return self._store.rank(score)
 
-        names = list(map(lambda x: x[0], self._scoreboard))
-        scores = list(map(lambda x: x[1], self._scoreboard))
-        final_text = "\n".join(map(lambda x: f"{x[0]}\n{x[1]}", zip(names, scores)))
+    def percentile_of(self, score):
+        """
+        Returns the percent of the saved scores that are lower than the score
+        """
+        return self._store.percentile(score)
 
-        data_writable = open("data/scoredata", "w", encoding="utf-8")
-        data_writable.write(final_text)
+    def update_score_data(self):
+        """
+        Scores are saved as soon as they are added, the method is kept for the older scenes
+        """
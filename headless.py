@@ -0,0 +1,202 @@
+import heapq
+import struct
+
+
+class HeadlessImage:
+    def __init__(self, width, height):
+        """
+        Stand-in for a PhotoImage, only its size is known
+        """
+        self._width = width
+        self._height = height
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+
+class RecordingDraw:
+    def __init__(self, record=False):
+        """
+        Draw sink that draws nothing. It counts the draw calls of every frame and can keep them for inspection
+        :param record: If True, the draw calls of the last frame are kept in last_frame
+        """
+        self._record = record
+        self.operations = 0
+        self.frames = 0
+        self.last_frame = []
+        self._current_frame = []
+        self._groups = {}  # Group -> (offset x, offset y)
+
+    def begin_frame(self):
+        self.operations = 0
+        self._current_frame = []
+
+    def move_group(self, group, offset_x, offset_y):
+        if self._groups.get(group, (offset_x, offset_y)) != (offset_x, offset_y):
+            self.operations += 1
+        self._groups[group] = (offset_x, offset_y)
+
+    def draw_image(self, key, layer, shape_name, pos_x, pos_y, group=None):
+        if group is not None:
+            offset_x, offset_y = self._groups[group]
+            pos_x += offset_x
+            pos_y += offset_y
+        self.operations += 1
+        if self._record:
+            self._current_frame.append(("image", shape_name, pos_x, pos_y))
+
+    def draw_text(self, key, content, color, font, align, pos_x, pos_y):
+        self.operations += 1
+        if self._record:
+            self._current_frame.append(("text", content, pos_x, pos_y))
+
+    def draw_transition(self, radius):
+        self.operations += 1
+        if self._record:
+            self._current_frame.append(("transition", radius))
+
+    def end_frame(self):
+        self.frames += 1
+        if self._record:
+            self.last_frame = self._current_frame
+
+    def forget(self, key):
+        self._groups.pop(key, None)
+
+
+class ScriptedInput:
+    def __init__(self, key_presses=(), text_inputs=()):
+        """
+        Key presses and text inputs that are given to the game instead of a user
+        :param key_presses: Iterable of (time in milliseconds, key name) tuples, e.g. (1000, "Return")
+        :param text_inputs: Answers of the text input dialogs in order, None is a cancelled dialog
+        """
+        self.key_presses = sorted(key_presses, key=lambda x: x[0])
+        self.text_inputs = list(text_inputs)
+
+
+class HeadlessBackend:
+    def __init__(self, script=None, max_speed=True, end_time=None, record_draws=False):
+        """
+        Runs the game without a display. Time is simulated, so the game can run much faster than real time
+        :param script: ScriptedInput that presses the keys
+        :param max_speed: If True, mainloop jumps straight to the next timer, otherwise the clock only
+        moves when advance is called
+        :param end_time: The time in milliseconds at which mainloop returns, None runs until stop is called
+        :param record_draws: If True, the draw calls of the last frame are kept by the draw sink
+        """
+        self._script = script if script else ScriptedInput()
+        self._text_inputs = list(self._script.text_inputs)
+        self.max_speed = max_speed
+        self.end_time = end_time
+        self._record_draws = record_draws
+
+        self._time = 0
+        self._timers = []  # Heap of (due time, order, method)
+        self._timer_order = 0
+        self._stopped = False
+
+        self._shapes = {}
+        self._key_methods = {}
+        self.draw = None
+        self.bg_color = "white"
+
+        for press_time, key in self._script.key_presses:
+            self.ontimer(lambda k=key: self.press_key(k), press_time)
+
+    def open_window(self, title, width, height, icon_path):
+        pass
+
+    def create_draw(self, retained_mode):
+        self.draw = RecordingDraw(self._record_draws)
+        return self.draw
+
+    def now(self):
+        return self._time
+
+    def ontimer(self, method, delay):
+        heapq.heappush(self._timers, (self._time + delay, self._timer_order, method))
+        self._timer_order += 1
+
+    def advance(self, milliseconds):
+        """
+        Moves the clock forward and calls every timer that is due
+        """
+        end = self._time + milliseconds
+        while self._timers and self._timers[0][0] <= end and not self._stopped:
+            self._run_next_timer()
+        self._time = max(self._time, end)
+
+    def _run_next_timer(self):
+        due, _order, method = heapq.heappop(self._timers)
+        self._time = max(self._time, due)
+        method()
+
+    def mainloop(self):
+        if not self.max_speed:
+            return
+        while self._timers and not self._stopped:
+            if self.end_time is not None and self._timers[0][0] > self.end_time:
+                self._time = self.end_time
+                break
+            self._run_next_timer()
+
+    def stop(self):
+        self._stopped = True
+
+    def getshapes(self):
+        return list(self._shapes)
+
+    def register_shape(self, name):
+        self.register_read_shape(name, self.read_shape(name))
+
+    def read_shape(self, name):
+        # The size of a GIF is in its header, the rest of the file is never decoded
+        with open(name, "rb") as gif:
+            return struct.unpack("<HH", gif.read(10)[6:10])
+
+    def register_read_shape(self, name, data):
+        self._shapes[name] = HeadlessImage(*data)
+
+    def onkey(self, method, key):
+        self._key_methods[key] = method
+
+    def press_key(self, key):
+        method = self._key_methods.get(key)
+        if method:
+            method()
+
+    def listen(self):
+        pass
+
+    def bgcolor(self, color):
+        self.bg_color = color
+
+    def textinput(self, title, prompt):
+        return self._text_inputs.pop(0) if self._text_inputs else None
+
+
+if __name__ == "__main__":
+    import time
+    import main
+    from gameManagement import get_assets
+
+    # Starts a game from the main menu, walks around, lets the time run out, skips the name input and
+    # returns to the menu
+    _walk = [(3005 + 130 * i, ("Up", "Right", "Down", "Left")[i // 3 % 4]) for i in range(48)]
+    _backend = HeadlessBackend(ScriptedInput([(1500, "Return"), *_walk, (31000, "Return")]), end_time=35000)
+    _start = time.perf_counter()
+    main.run_game(_backend)
+    _seconds = time.perf_counter() - _start
+    print(f"Simulated {_backend.now() / 1000:.1f} s in {_seconds:.2f} s, {_backend.draw.frames} frames, "
+          f"{_backend.now() / 1000 / _seconds:.0f}x real time")
+    print(f"Time to first frame {main.renderer.timings['time_to_first_frame'][0]:.1f} ms, time to level ready "
+          f"{main.renderer.timings['time_to_level_ready'][0]:.1f} ms, assets preloaded in "
+          f"{get_assets().preload_time:.1f} ms")
+    _latencies = main.renderer.timings.get("input_latency", [])
+    if _latencies:
+        print(f"Input latency {sum(_latencies) / len(_latencies):.1f} ms mean, {max(_latencies):.1f} ms max "
+              f"over {len(_latencies)} moves")
@@ -0,0 +1,227 @@
+import bisect
+import heapq
+import os
+import sqlite3
+
+
+class LeaderboardStore:
+    def __init__(self, path="data/scores.db", legacy_path="data/scoredata"):
+        """
+        Every submitted score in an SQLite database. Writes are transactions, so any number of game instances
+        can submit scores at the same time, and the queries use indexes so they stay fast with millions of scores
+        :param path: Path of the database file, it is created if it does not exist
+        :param legacy_path: Scores of the old text file are moved into the database the first time it is opened
+        """
+        self._connection = sqlite3.connect(path, timeout=10, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")  # Readers do not block the writer
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+
+        with self._transaction():
+            self._connection.execute("CREATE TABLE IF NOT EXISTS scores "
+                                     "(id INTEGER PRIMARY KEY, name TEXT NOT NULL, score INTEGER NOT NULL)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC, id)")
+            # Number of scores of every score value, ranks are counted from it instead of the scores
+            self._connection.execute("CREATE TABLE IF NOT EXISTS score_counts "
+                                     "(score INTEGER PRIMARY KEY, count INTEGER NOT NULL)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+            migrated = self._connection.execute("SELECT value FROM meta WHERE key = 'legacy_migrated'").fetchone()
+            if not migrated:
+                if legacy_path and os.path.exists(legacy_path):
+                    for name, score in read_legacy_scores(legacy_path):
+                        self._insert(name, score)
+                self._connection.execute("INSERT INTO meta VALUES ('legacy_migrated', '1')")
+
+    def _transaction(self):
+        return _Transaction(self._connection)
+
+    def _insert(self, name, score):
+        row_id = self._connection.execute("INSERT INTO scores (name, score) VALUES (?, ?)", (name, score)).lastrowid
+        self._connection.execute("INSERT INTO score_counts VALUES (?, 1) "
+                                 "ON CONFLICT (score) DO UPDATE SET count = count + 1", (score,))
+        return row_id
+
+    def add(self, name, score):
+        """
+        Saves a score
+        :return: Id of the score
+        """
+        with self._transaction():
+            return self._insert(name, score)
+
+    def add_many(self, entries):
+        """
+        Saves many (name, score) tuples in a single transaction
+        """
+        with self._transaction():
+            for name, score in entries:
+                self._insert(name, score)
+
+    def top(self, count):
+        """
+        Returns the best scores as (id, name, score) tuples, older scores come first among the equal scores
+        """
+        return self._connection.execute("SELECT id, name, score FROM scores ORDER BY score DESC, id LIMIT ?",
+                                        (count,)).fetchall()
+
+    def rank(self, score):
+        """
+        Returns the place a score would get, 1 is the best
+        """
+        better = self._connection.execute("SELECT SUM(count) FROM score_counts WHERE score > ?", (score,)).fetchone()[0]
+        return (better or 0) + 1
+
+    def percentile(self, score):
+        """
+        Returns the percent of the saved scores that are lower than the score
+        """
+        lower, total = self._connection.execute("SELECT COALESCE(SUM(CASE WHEN score < ? THEN count END), 0), "
+                                                "COALESCE(SUM(count), 0) FROM score_counts", (score,)).fetchone()
+        return lower * 100 / total if total else 100
+
+    def __len__(self):
+        return self._connection.execute("SELECT COALESCE(SUM(count), 0) FROM score_counts").fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+
+class ScoreRanking:
+    def __init__(self, size=7, entries=()):
+        """
+        Ranks a stream of scores in memory. The best scores are kept in a bounded heap and every score is kept in
+        a sorted list that is split into blocks, so a new score is put in place with bisect in a short block and
+        ranks and percentiles are found with bisect on the block maximums and in one block. The lengths of the
+        blocks before it are summed in a Fenwick tree, so every operation is O(log n) and the memory only
+        depends on the number of scores, not on their values
+        :param size: Number of best scores that are kept
+        :param entries: (name, score) tuples to start with
+        """
+        self.size = size
+        self._top = []  # Min heap of (score, -order, name), the worst of the best scores is on top
+        self._order = 0
+        self._blocks = []  # Sorted lists of scores, every score of a block is at most the scores of the next block
+        self._block_maxes = []  # Largest score of every block
+        self._block_tree = [0]  # Fenwick tree of the block lengths, rebuilt when a block is split
+        self._count = 0
+        for name, score in entries:
+            self.add(name, score)
+
+    def would_place(self, score):
+        """
+        Returns True if the score would get into the best scores, an equal score does not push an older one out
+        """
+        return len(self._top) < self.size or score > self._top[0][0]
+
+    def add(self, name, score):
+        """
+        Adds a score
+        :return: True if it got into the best scores
+        """
+        self._insert_score(score)
+        self._order += 1
+        if len(self._top) < self.size:
+            heapq.heappush(self._top, (score, -self._order, name))
+            return True
+        if score > self._top[0][0]:
+            heapq.heapreplace(self._top, (score, -self._order, name))
+            return True
+        return False
+
+    def top(self):
+        """
+        Returns the best scores as (name, score) tuples, older scores come first among the equal scores
+        """
+        return [(name, score) for score, _order, name in sorted(self._top, reverse=True)]
+
+    def _insert_score(self, score):
+        self._count += 1
+        if not self._blocks:
+            self._blocks.append([score])
+            self._block_maxes.append(score)
+            self._rebuild_block_tree()
+            return
+
+        # The score goes to the first block that has a score as big, or to the last block
+        i = min(bisect.bisect_left(self._block_maxes, score), len(self._blocks) - 1)
+        block = self._blocks[i]
+        bisect.insort(block, score)
+        self._block_maxes[i] = block[-1]
+        if len(block) > 2 * _BLOCK_SIZE:
+            self._blocks[i:i + 1] = [block[:_BLOCK_SIZE], block[_BLOCK_SIZE:]]
+            self._block_maxes[i:i + 1] = [block[_BLOCK_SIZE - 1], block[-1]]
+            self._rebuild_block_tree()
+        else:
+            tree = self._block_tree
+            i += 1
+            while i < len(tree):
+                tree[i] += 1
+                i += i & -i
+
+    def _rebuild_block_tree(self):
+        # Linear build, every node adds its sum to its parent
+        tree = [0] + [len(block) for block in self._blocks]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._block_tree = tree
+
+    def _count_below(self, score, bisect_in_block=bisect.bisect_left):
+        # Number of added scores lower than the score, or with bisect_right, not higher than the score.
+        # The blocks before the first block that reaches the score are counted whole
+        blocks = self._blocks
+        if bisect_in_block is bisect.bisect_left:
+            i = bisect.bisect_left(self._block_maxes, score)
+        else:
+            i = bisect.bisect_right(self._block_maxes, score)
+        total = 0
+        j = i
+        while j > 0:
+            total += self._block_tree[j]
+            j -= j & -j
+        if i < len(blocks):
+            total += bisect_in_block(blocks[i], score)
+        return total
+
+    def rank(self, score):
+        """
+        Returns the place the score would get among every added score, 1 is the best
+        """
+        return self._count - self._count_below(score, bisect.bisect_right) + 1
+
+    def percentile(self, score):
+        """
+        Returns the percent of the added scores that are lower than the score, e.g. "you beat 83% of the runs"
+        """
+        if not self._count:
+            return 100
+        return self._count_below(score) * 100 / self._count
+
+    def __len__(self):
+        return self._count
+
+
+_BLOCK_SIZE = 1000  # Blocks of ScoreRanking are split in two when they get twice as long
+
+
+class _Transaction:
+    def __init__(self, connection):
+        # BEGIN IMMEDIATE takes the write lock at the start, other instances wait for it up to the connection timeout
+        self._connection = connection
+
+    def __enter__(self):
+        self._connection.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._connection.execute("COMMIT" if exc_type is None else "ROLLBACK")
+
+
+def read_legacy_scores(path):
+    """
+    Reads the old score file, its lines are names and scores one after the other
+    :return: List of (name, score) tuples
+    """
+    with open(path, "r", encoding="utf-8", errors="replace") as legacy_file:
+        lines = legacy_file.read().split("\n")
+    return [(name, int(score)) for name, score in zip(lines[0::2], lines[1::2]) if score.strip()]
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import struct
+import zlib
+
+import mazeGenerator
+from levelGrid import LevelGrid
+
+
+class LevelCache:
+    _MAGIC = b"MZLC"
+    _HEADER = struct.Struct("<4sII")  # Magic, width, height
+
+    def __init__(self, folder="data/levelcache"):
+        """
+        Generated levels saved on the disk, so a level that is played again loads instead of being generated.
+        A level is found by the hash of its (algorithm, size, seed) key, so a changed algorithm never loads
+        the levels of the older one
+        :param folder: Folder of the saved levels, it is created when the first level is saved
+        """
+        self.folder = folder
+        self.hits = 0
+        self.misses = 0
+
+    def _path_of(self, algorithm, level_width, level_height, seed):
+        key = hashlib.sha256(f"{algorithm}/{level_width}x{level_height}/{seed}".encode("utf-8")).hexdigest()
+        return os.path.join(self.folder, key[:2], key + ".lvl")
+
+    def get(self, algorithm, level_width, level_height, seed):
+        """
+        Returns the saved (LevelGrid, water variants) tuple of the key, None if it is not saved or it is broken
+        """
+        try:
+            with open(self._path_of(algorithm, level_width, level_height, seed), "rb") as level_file:
+                data = level_file.read()
+            magic, width, height = self._HEADER.unpack_from(data)
+            body = zlib.decompress(data[self._HEADER.size:])
+        except (OSError, struct.error, zlib.error):
+            return None
+
+        tile_count = width * height
+        if magic != self._MAGIC or (width, height) != (level_width, level_height) or len(body) != 2 * tile_count:
+            return None
+        return LevelGrid(width, height, bytearray(body[:tile_count])), body[tile_count:]
+
+    def put(self, algorithm, seed, level, water_variants):
+        """
+        Saves a level. The file is written next to its final path and then renamed,
+        so another game instance never reads a half written level
+        """
+        path = self._path_of(algorithm, level.width, level.height, seed)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as level_file:
+            level_file.write(self._HEADER.pack(self._MAGIC, level.width, level.height))
+            level_file.write(zlib.compress(level.to_bytes() + bytes(water_variants), 1))
+        os.replace(temporary_path, path)
+
+    def load_or_generate(self, level_width, level_height, seed):
+        """
+        Returns the (LevelGrid, water variants) tuple of a seed, it is generated and saved if it is not saved yet
+        """
+        cached = self.get(mazeGenerator.ALGORITHM, level_width, level_height, seed)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        level, water_variants = mazeGenerator.generate_level_data(level_width, level_height, seed)
+        try:
+            self.put(mazeGenerator.ALGORITHM, seed, level, water_variants)
+        except OSError:
+            pass  # A level that can not be saved is generated again next time
+        return level, water_variants
@@ -0,0 +1,79 @@
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class LevelGrid:
+    def __init__(self, width, height, cells=None):
+        """
+        Compact level storage with one byte per tile. A NumPy uint8 array is used when NumPy is available,
+        otherwise an array('B'). Tiles are stored column by column, the tile at x, y has the index x * height + y
+        :param width: Number of units in width
+        :param height: Number of units in height
+        :param cells: Optional bytes-like object with width * height tile values, 1: wall 0: empty
+        """
+        self.width = width
+        self.height = height
+
+        if cells is None:
+            cells = bytearray(width * height)
+        if len(cells) != width * height:
+            raise ValueError(f"Grid of {width}x{height} needs {width * height} tiles, got {len(cells)}")
+
+        if numpy is not None:
+            # frombuffer does not copy a bytearray, the grid shares its memory
+            self.cells = numpy.frombuffer(cells if isinstance(cells, bytearray) else bytearray(cells),
+                                          dtype=numpy.uint8)
+        else:
+            self.cells = array("B", cells)
+
+    def index(self, x, y):
+        return x * self.height + y
+
+    def tile_at(self, x, y):
+        """
+        Returns the tile number at x, y; if there is no tile returns 1
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return int(self.cells[x * self.height + y])
+        return 1
+
+    def set_tile(self, x, y, value):
+        self.cells[x * self.height + y] = value
+
+    def to_bytes(self):
+        return bytes(self.cells)
+
+    def wall_masks(self):
+        """
+        Calculates the tile_wall_N number of every tile in one pass. Each bit tells whether there is a wall
+        next to the tile: 1 below (y + 1), 2 on the left, 4 above (y - 1) and 8 on the right.
+        Outside of the level counts as a wall
+        :return: Flat array of masks with the same indexing as cells
+        """
+        w = self.width
+        h = self.height
+
+        if numpy is not None:
+            padded = numpy.ones((w + 2, h + 2), dtype=numpy.uint8)
+            padded[1:-1, 1:-1] = self.cells.reshape(w, h)
+            walls = (padded == 1).view(numpy.uint8)
+            masks = walls[1:-1, 2:] | walls[:-2, 1:-1] << 1 | walls[1:-1, :-2] << 2 | walls[2:, 1:-1] << 3
+            return masks.ravel()
+
+        # Without NumPy every byte of a big integer is used as a lane, shifting the integer by 8 bits
+        # moves every tile to its neighbour's lane. The level is padded with walls so nothing wraps around
+        ph = h + 2
+        cells = bytes(self.cells)
+        border = b"\x01" * ph
+        padded = border + b"".join(b"\x01" + cells[x * h:(x + 1) * h] + b"\x01" for x in range(w)) + border
+        walls = int.from_bytes(padded.translate(_WALL_TABLE), "little")
+        masks = walls >> 8 | walls << (8 * ph + 1) | walls << 10 | walls >> (8 * ph) << 3
+        masks = masks.to_bytes(len(padded) + ph + 2, "little")
+        return array("B", b"".join(masks[(x + 1) * ph + 1:(x + 1) * ph + 1 + h] for x in range(w)))
+
+
+_WALL_TABLE = bytes(1 if i == 1 else 0 for i in range(256))
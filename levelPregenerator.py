@@ -0,0 +1,110 @@
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import mazeGenerator
+from levelCache import LevelCache
+from levelGrid import LevelGrid
+from shrimpSchedule import plan_shrimp_schedule, schedule_from_bytes
+
+_HEADER = struct.Struct("<III")  # Width, height, size of the shrimp schedule
+
+
+def build_level_data(level_width, level_height, seed, cache_folder=None, shrimp_start=None):
+    """
+    Generates a level and everything that is needed to show it, it runs in a worker process
+    :param cache_folder: Folder of a LevelCache that the level is loaded from and saved to, no cache if None
+    :param shrimp_start: (start x, start y, shrimp creation range) of the player, the shrimps of the level are
+    planned too if it is given
+    :return: Compact buffer: header, tiles, water variants and wall masks, one byte per tile each,
+    and the shrimp schedule
+    """
+    if cache_folder:
+        level, water_variants = LevelCache(cache_folder).load_or_generate(level_width, level_height, seed)
+    else:
+        level, water_variants = mazeGenerator.generate_level_data(level_width, level_height, seed)
+    schedule = b""
+    if shrimp_start is not None:
+        schedule = plan_shrimp_schedule(level, *shrimp_start, mazeGenerator.rng_stream(seed, "shrimp")).to_bytes()
+    return b"".join((_HEADER.pack(level_width, level_height, len(schedule)), level.to_bytes(),
+                     bytes(water_variants), bytes(level.wall_masks()), schedule))
+
+
+def unpack_level_data(buffer):
+    """
+    Reads a buffer of build_level_data
+    :return: (LevelGrid, water variants, wall masks, ShrimpSchedule) tuple, the schedule is None if it was not planned
+    """
+    level_width, level_height, schedule_size = _HEADER.unpack_from(buffer)
+    tile_count = level_width * level_height
+    start = _HEADER.size
+    level = LevelGrid(level_width, level_height, bytearray(buffer[start:start + tile_count]))
+    water_variants = buffer[start + tile_count:start + 2 * tile_count]
+    wall_masks = buffer[start + 2 * tile_count:start + 3 * tile_count]
+    schedule = None
+    if schedule_size:
+        schedule = schedule_from_bytes(buffer[start + 3 * tile_count:start + 3 * tile_count + schedule_size])
+    return level, water_variants, wall_masks, schedule
+
+
+class LevelPregenerator:
+    def __init__(self, cache_folder=None):
+        """
+        Generates the next level in a worker process while the current one is played, so the level change
+        only has to set up the sprites. If a worker process can not be used, levels are generated when asked for
+        :param cache_folder: Folder of the LevelCache of seeded levels, no cache if None
+        """
+        self._cache_folder = cache_folder
+        self._executor = None
+        self._use_processes = True
+        self._futures = {}  # (width, height, seed) -> Future of build_level_data
+
+    def request(self, level_width, level_height, seed, shrimp_start=None):
+        """
+        Starts generating a level in the background
+        :param shrimp_start: (start x, start y, shrimp creation range) of the player to plan the shrimps with
+        """
+        key = (level_width, level_height, seed)
+        if key in self._futures or not self._use_processes:
+            return
+        try:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=1)
+            self._futures[key] = self._executor.submit(build_level_data, level_width, level_height, seed,
+                                                       self._cache_folder, shrimp_start)
+        except (OSError, RuntimeError, NotImplementedError, BrokenProcessPool):
+            # E.g. a platform without process support, the levels are generated in this process
+            self._use_processes = False
+
+    def take(self, level_width, level_height, seed):
+        """
+        Returns a level, it waits for the worker if the level is still being generated and
+        generates it at once if it was not requested or the worker failed
+        :return: (LevelGrid, water variants, wall masks, ShrimpSchedule) tuple, the schedule is None if
+        the level was not requested with a shrimp start
+        """
+        future = self._futures.pop((level_width, level_height, seed), None)
+        buffer = None
+        if future is not None:
+            try:
+                buffer = future.result()
+            except (OSError, RuntimeError, BrokenProcessPool):
+                self._use_processes = False
+        if buffer is None:
+            buffer = build_level_data(level_width, level_height, seed, self._cache_folder)
+        return unpack_level_data(buffer)
+
+    def clear(self):
+        """
+        Forgets the requested levels, e.g. when a new run picks new seeds. Levels that are not started yet are
+        cancelled, the buffers of the finished ones are dropped
+        """
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._futures.clear()
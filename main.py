@@ -1,7 +1,14 @@
+import multiprocessing
+import random
+import sys
+import time
 from gameManagement import *
+import assets
 import mainMenu
 import game
 import scoreboard
+from levelCache import LevelCache
+from levelPregenerator import LevelPregenerator
 
 
 def initialize_main_menu():
@@ -9,13 +16,50 @@ def initialize_main_menu():
     renderer.offset_x = 0
     renderer.offset_y = 0
     main_menu = mainMenu.MainMenu(renderer, keyboardInput, start_new_game)
+    # Starting the worker takes a while, so it is started after the menu is on the screen
+    get_backend().ontimer(lambda: pregenerate_level(1), 100)
 
 
 def start_new_game():
-    level = game.Game(renderer, keyboardInput, level_completed, timer_run_out)
-    level_size = 1 + 10 * game_variables[0]
-    level.generate_level(level_size, level_size)
+    start = time.perf_counter()
+    level = game.Game(renderer, keyboardInput, level_completed, timer_run_out, level_cache)
+    if world_mode:
+        level.generate_world(level_seed_of(game_variables[0]))
+    elif level_path:
+        level.load_level(level_path)
+    else:
+        # The level was generated in the background while the menu or the previous level was shown
+        level_size = size_of_level(game_variables[0])
+        level_seed = level_seed_of(game_variables[0])
+        level.generate_level(level_size, level_size, level_seed,
+                             level_pregenerator.take(level_size, level_size, level_seed))
     level.initialize_game(game_variables)
+    renderer.measure_until_next_frame("time_to_level_ready", start)
+
+    if game_variables[0] < 3:
+        pregenerate_level(game_variables[0] + 1)
+
+
+def size_of_level(level_number):
+    return 1 + 10 * level_number
+
+
+def level_seed_of(level_number):
+    # Every level of a seeded run has its own seed, so the three levels are different.
+    # Random runs pick the seeds of their levels beforehand, so the levels can be generated in the background
+    if run_seed is not None:
+        return f"{run_seed}/{level_number}"
+    if level_number not in level_seeds:
+        level_seeds[level_number] = random.getrandbits(64)
+    return level_seeds[level_number]
+
+
+def pregenerate_level(level_number):
+    if not world_mode and not level_path:
+        # The shrimps are planned in the worker too, so collecting a shrimp is only a lookup
+        level_pregenerator.request(size_of_level(level_number), size_of_level(level_number),
+                                   level_seed_of(level_number),
+                                   (*game.player_start_of(level_number), game.shrimp_creation_range_of(level_number)))
 
 
 def level_completed():
@@ -42,14 +86,61 @@ def reset_game_variables():
     game_variables[0] = 1
     game_variables[1] = 1250
     game_variables[2] = 0
+    # The levels requested for the seeds of the last run are not going to be played
+    level_seeds.clear()
+    level_pregenerator.clear()
+
+
+def daily_seed():
+    """
+    Returns the seed of today's levels, every player gets the same levels on the same day
+    """
+    return time.strftime("daily-%Y-%m-%d")
+
+
+def run_game(backend=None, seed=None, world=False, maze_path=None):
+    """
+    Opens the main menu and runs the game until the window is closed
+    :param backend: Backend of the game, the turtle backend is used if it is None
+    :param seed: Seed of the levels, e.g. daily_seed(). Levels are random if None
+    :param world: If True, the levels are endless worlds that are generated while the player explores them
+    :param maze_path: Path of a maze file saved with Game.save_level, every level is played in it if it is given
+    """
+    global renderer, keyboardInput, game_variables, run_seed, level_cache, world_mode, level_seeds, \
+        level_pregenerator, level_path
+    start = time.perf_counter()
+    if backend:
+        set_backend(backend)
+    run_seed = seed
+    world_mode = world
+    level_path = maze_path
+    level_cache = LevelCache()
+    level_seeds = {}  # Level number -> seed of the level in a random run
+    level_pregenerator = LevelPregenerator(level_cache.folder if seed is not None else None)
 
-
-if __name__ == "__main__":
     renderer = GameRenderer(640, 640)
-    keyboardInput = KeyboardState()
+    keyboardInput = KeyboardState(renderer)
 
     game_variables = [1, 1250, 0]  # level number, remaining time (seconds * 25), score
     initialize_main_menu()
+    renderer.measure_until_next_frame("time_to_first_frame", start)
+
+    # The menu registers only its own assets, the rest are loaded while its entrance transition plays
+    get_assets().preload(assets.manifest())
 
     renderer.keep_window_open()
+    level_pregenerator.shutdown()
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # The worker processes of the frozen executable start from here
+    # "--daily" plays the levels of the day, "--seed VALUE" plays the levels of a seed, "--world" plays endless worlds
+    # and "--level PATH" plays a saved maze file
+    _seed = None
+    if "--daily" in sys.argv:
+        _seed = daily_seed()
+    elif "--seed" in sys.argv[:-1]:
+        _seed = sys.argv[sys.argv.index("--seed") + 1]
+    _maze_path = sys.argv[sys.argv.index("--level") + 1] if "--level" in sys.argv[:-1] else None
+    run_game(seed=_seed, world="--world" in sys.argv, maze_path=_maze_path)
     # Anything under this line will not work
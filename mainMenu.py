@@ -35,11 +35,11 @@ class MainMenu:
         self.spr_wave2 = GameSprite(["mainmenu_wave"], -1, 0, -140)
         self._registered_objects.append(self.spr_wave2)
 
-        self.spr_cloud0 = GameSprite(["mainmenu_cloud_0", "mainmenu_cloud_1", "mainmenu_cloud_2"], -4, -180, 240)
+        self.spr_cloud0 = GameSprite("mainmenu_cloud", -4, -180, 240)
         self.spr_cloud0.alwaysDraw = True
         self._registered_objects.append(self.spr_cloud0)
 
-        self.spr_cloud1 = GameSprite(["mainmenu_cloud_0", "mainmenu_cloud_1", "mainmenu_cloud_2"], -5, 180, 180)
+        self.spr_cloud1 = GameSprite("mainmenu_cloud", -5, 180, 180)
         self.spr_cloud1.alwaysDraw = True
         self._registered_objects.append(self.spr_cloud1)
 
@@ -92,7 +92,6 @@ class MainMenu:
 
         for o in self._registered_objects:
             renderer.register_object(o)
-        renderer.sort_sprites_by_layer()
 
         # Registering methods
         renderer.register_method(self._background_animation)
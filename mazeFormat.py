@@ -0,0 +1,186 @@
+import json
+import mmap
+import struct
+import sys
+import time
+
+from levelGrid import LevelGrid
+
+# File layout:
+#   header: magic, version, width, height, chunk size, flags, metadata length
+#   metadata: UTF-8 JSON object
+#   wall section: one bit per tile, 1 is a wall
+#   water section (if FLAG_WATER): one bit per tile, the tile_water_N variant
+# A section is a row-major list of chunk size x chunk size chunks, the chunks are row-major lists of bit rows.
+# Bit x % 8 of a byte is the tile at x, tiles after the edge of the level are walls. So the tile at x, y is found
+# without reading anything else, and a chunk is one contiguous block of the file
+MAGIC = b"MAZB"
+VERSION = 1
+FLAG_WATER = 1
+_HEADER = struct.Struct("<4sHIIHHI")
+
+
+def save_level(path, level, water_variants=None, metadata=None, chunk_size=64):
+    """
+    Saves a level in the bit-packed maze format
+    :param path: Path of the file
+    :param level: LevelGrid of the level
+    :param water_variants: Optional bytes with the tile_water_N variant of every tile, with the level's indexing
+    :param metadata: Optional JSON friendly dictionary, e.g. the seed and the algorithm of the level
+    :param chunk_size: Width and height of the chunks in tiles, a multiple of 8
+    """
+    if chunk_size % 8 or chunk_size <= 0:
+        raise ValueError(f"Chunk size must be a positive multiple of 8, got {chunk_size}")
+    metadata_bytes = json.dumps(metadata or {}).encode("utf-8")
+    flags = FLAG_WATER if water_variants is not None else 0
+
+    with open(path, "wb") as level_file:
+        level_file.write(_HEADER.pack(MAGIC, VERSION, level.width, level.height, chunk_size, flags,
+                                      len(metadata_bytes)))
+        level_file.write(metadata_bytes)
+        _write_section(level_file, bytes(level.cells), level.width, level.height, chunk_size, _WALL_BITS, "1")
+        if water_variants is not None:
+            _write_section(level_file, bytes(water_variants), level.width, level.height, chunk_size,
+                           _LOWEST_BITS, "0")
+
+
+def _write_section(level_file, cells, width, height, chunk_size, bit_table, padding):
+    chunks_x = -(-width // chunk_size)
+    padded_width = chunks_x * chunk_size
+    row_bytes = chunk_size // 8
+    padding_row = padding * padded_width
+
+    for chunk_y in range(-(-height // chunk_size)):
+        # Packing the rows of a band of chunks. A row is every height-th byte of the column-major cells,
+        # its tiles are turned into "0" and "1" characters and read as one binary number
+        band = []
+        for y in range(chunk_y * chunk_size, (chunk_y + 1) * chunk_size):
+            if y < height:
+                row = cells[y::height].translate(bit_table).decode("ascii") + padding * (padded_width - width)
+            else:
+                row = padding_row
+            band.append(int(row[::-1], 2).to_bytes(padded_width // 8, "little"))
+
+        for chunk_x in range(chunks_x):
+            start = chunk_x * row_bytes
+            level_file.write(b"".join(row[start:start + row_bytes] for row in band))
+
+
+class MappedLevel:
+    def __init__(self, path):
+        """
+        Level that is read from a bit-packed maze file through mmap. Only the pages of the tiles that are looked at
+        are read, so a maze with tens of millions of tiles opens at once and uses the memory of the visited parts.
+        It has the width, height and tile_at of a LevelGrid, so the player can move in it
+        :param path: Path of a file saved by save_level
+        """
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.width, self.height, self.chunk_size, flags, metadata_length = \
+            _HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} maze file")
+        self.metadata = json.loads(self._map[_HEADER.size:_HEADER.size + metadata_length].decode("utf-8"))
+
+        self._chunks_x = -(-self.width // self.chunk_size)
+        self._row_bytes = self.chunk_size // 8
+        self._chunk_bytes = self._row_bytes * self.chunk_size
+        section_size = self._chunks_x * -(-self.height // self.chunk_size) * self._chunk_bytes
+        self._wall_offset = _HEADER.size + metadata_length
+        self._water_offset = self._wall_offset + section_size if flags & FLAG_WATER else None
+
+    def _bit_at(self, section_offset, x, y):
+        chunk_size = self.chunk_size
+        chunk = (y // chunk_size) * self._chunks_x + x // chunk_size
+        offset = section_offset + chunk * self._chunk_bytes + (y % chunk_size) * self._row_bytes + (x % chunk_size) // 8
+        return self._map[offset] >> (x % 8) & 1
+
+    def tile_at(self, x, y):
+        """
+        Returns the tile number at x, y; if there is no tile returns 1
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self._bit_at(self._wall_offset, x, y)
+        return 1
+
+    def water_at(self, x, y):
+        """
+        Returns the tile_water_N variant at x, y, 0 if the file has no water section
+        """
+        if self._water_offset is None or not (0 <= x < self.width and 0 <= y < self.height):
+            return 0
+        return self._bit_at(self._water_offset, x, y)
+
+    def region(self, x, y, width, height):
+        """
+        Reads a rectangle of the level, e.g. the tiles around the camera
+        :return: (LevelGrid, water variants) tuple of the rectangle, tiles out of the level are walls
+        """
+        cells = bytearray(width * height)
+        water_variants = bytearray(width * height)
+        i = 0
+        for tile_x in range(x, x + width):
+            for tile_y in range(y, y + height):
+                cells[i] = self.tile_at(tile_x, tile_y)
+                water_variants[i] = self.water_at(tile_x, tile_y)
+                i += 1
+        return LevelGrid(width, height, cells), bytes(water_variants)
+
+    def to_level_grid(self):
+        """
+        Reads the whole level into a LevelGrid
+        """
+        return self.region(0, 0, self.width, self.height)[0]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def open_level(path):
+    """
+    Opens a bit-packed maze file, see MappedLevel
+    """
+    return MappedLevel(path)
+
+
+_WALL_BITS = bytes(ord("1") if i == 1 else ord("0") for i in range(256))
+_LOWEST_BITS = bytes(ord("1") if i & 1 else ord("0") for i in range(256))
+
+
+if __name__ == "__main__":
+    import os
+    import random
+    import tempfile
+    import mazeGenerator
+
+    # Saves a big maze and measures how long opening it and looking up random tiles takes
+    _size = int(sys.argv[1]) if len(sys.argv) > 1 else 2001
+    _level, _water = mazeGenerator.generate_level_data(_size, _size, "mazeFormat")
+    _fd, _path = tempfile.mkstemp(suffix=".mzb")
+    os.close(_fd)
+    try:
+        _start = time.perf_counter()
+        save_level(_path, _level, _water, {"seed": "mazeFormat", "algorithm": mazeGenerator.ALGORITHM})
+        print(f"Saved {_size}x{_size} in {(time.perf_counter() - _start) * 1000:.1f} ms")
+
+        _start = time.perf_counter()
+        with open_level(_path) as _mapped:
+            _opened = time.perf_counter()
+            _rng = random.Random(0)
+            _points = [(_rng.randrange(_size), _rng.randrange(_size)) for _i in range(100000)]
+            _lookup_start = time.perf_counter()
+            _mismatches = sum(_mapped.tile_at(_x, _y) != _level.tile_at(_x, _y) for _x, _y in _points)
+            _lookups = time.perf_counter() - _lookup_start
+        print(f"Opened in {(_opened - _start) * 1000:.2f} ms, 100000 lookups in {_lookups * 1000:.1f} ms, "
+              f"{_mismatches} mismatches")
+    finally:
+        os.remove(_path)
@@ -0,0 +1,114 @@
+import random
+import time
+from levelGrid import LevelGrid
+
+
+def generate_maze(level_width, level_height, rng=random):
+    """
+    Generates a perfect maze where every empty tile is accessible from (1, 1).
+    The frontier of walls between accessible and inaccessible tiles is kept incrementally,
+    so the generation is linear in the number of tiles instead of rescanning the whole grid
+    :param level_width: Number of units in width
+    :param level_height: Number of units in height
+    :param rng: Random number generator, random module or a random.Random object
+    :return: LevelGrid where 1 is a wall and 0 is an empty tile
+    """
+    h = level_height
+    # Creating a grill shape, the tiles are stored column by column: index = x * h + y
+    # 1: wall 0: accessible empty 3: inaccessible empty
+    wall_column = b"\x01" * h
+    room_column = (b"\x01\x03" * (h // 2 + 1))[:h]
+    level = bytearray()
+    for x in range(level_width):
+        level += room_column if x % 2 == 1 else wall_column
+
+    # A frontier entry is wall_index * 4 + direction, the tile behind the wall is wall_index + deltas[direction]
+    deltas = (h, -h, 1, -1)
+    frontier = []
+    rand = rng.random
+
+    def open_room(room):
+        level[room] = 0
+        rx, ry = divmod(room, h)
+        if rx + 2 < level_width and level[room + 2 * h] == 3:
+            frontier.append((room + h) * 4)
+        if rx > 1 and level[room - 2 * h] == 3:
+            frontier.append((room - h) * 4 + 1)
+        if ry + 2 < h and level[room + 2] == 3:
+            frontier.append((room + 1) * 4 + 2)
+        if ry > 1 and level[room - 2] == 3:
+            frontier.append((room - 1) * 4 + 3)
+
+    if level_width > 1 and h > 1:
+        open_room(h + 1)
+
+    # Deleting a random wall that is between an accessible and inaccessible tile until the frontier is empty
+    while frontier:
+        i = int(rand() * len(frontier))
+        entry = frontier[i]
+        frontier[i] = frontier[-1]
+        frontier.pop()
+
+        wall = entry >> 2
+        room = wall + deltas[entry & 3]
+        if level[room] == 3:
+            level[wall] = 0
+            open_room(room)
+
+    return LevelGrid(level_width, h, level)
+
+
+ALGORITHM = "prim-frontier-v1"  # Changes whenever the same seed would generate a different level
+
+
+def rng_stream(seed, name):
+    """
+    Returns a random number generator of a subsystem. Every subsystem gets its own stream of the level seed,
+    so e.g. the maze does not change when the particles use more random numbers
+    :param seed: Seed of the level
+    :param name: Name of the subsystem, e.g. "maze", "water", "shrimp" or "particles"
+    """
+    return random.Random(f"{seed}/{name}")
+
+
+def generate_water_variants(level, rng=random):
+    """
+    Picks the tile_water_N variant of every tile
+    :param level: LevelGrid of the level
+    :param rng: Random number generator, random module or a random.Random object
+    :return: bytes with one 0 or 1 for every tile, with the same indexing as the level
+    """
+    return rng.randbytes(level.width * level.height).translate(_LOWEST_BIT_TABLE)
+
+
+def generate_level_data(level_width, level_height, seed):
+    """
+    Generates the maze and the water variants of a seed, the same seed always gives the same level
+    :return: (LevelGrid, water variants) tuple
+    """
+    level = generate_maze(level_width, level_height, rng_stream(seed, "maze"))
+    return level, generate_water_variants(level, rng_stream(seed, "water"))
+
+
+_LOWEST_BIT_TABLE = bytes(i & 1 for i in range(256))
+
+
+def benchmark_generation(sizes=(31, 101, 301, 1001), seed=0):
+    """
+    Measures the generation time for square mazes of the given sizes
+    :param sizes: Sizes of the mazes
+    :param seed: Seed of the random number generator
+    :return: List of (size, seconds) tuples
+    """
+    results = []
+    for size in sizes:
+        rng = random.Random(seed)
+        start = time.perf_counter()
+        generate_maze(size, size, rng)
+        results.append((size, time.perf_counter() - start))
+    return results
+
+
+if __name__ == "__main__":
+    for _size, _seconds in benchmark_generation():
+        print(f"{_size}x{_size}: {_seconds * 1000:.1f} ms")
@@ -1,40 +1,117 @@
+import random
+from array import array
 from gameManagement import *
 
 
-class BaseParticle:
-    def __init__(self, renderer, pos_x, pos_y, layer, vfx_sprites):
+# Effect types: (animation id, sorting layer, default speed), a higher speed means a slower animation
+EFFECTS = (
+    ("vfx_bell", 11, 2),
+    ("vfx_dust", 9, 3),
+    ("vfx_star", 9, 3),
+)
+SHRIMP_PARTICLES = 0
+DUST_PARTICLES = 1
+STAR_PARTICLES = 2
+
+
+class ParticleSystem:
+    def __init__(self, renderer, capacity=256):
+        """
+        Pool of particles kept in flat arrays. Live particles are packed at the start of the arrays, a dead
+        particle's slot is filled with the last live particle, so spawning and updating allocate nothing
+        :param renderer: GameRenderer object
+        :param capacity: Maximum number of live particles, new particles are dropped when the pool is full
+        """
         self._renderer = renderer
-        self.speed = 1
+        self.capacity = capacity
+        self.rng = random.Random()  # Random number generator of the particle jitters
+        self.count = 0
+
+        self._pos_x = array("d", [0]) * capacity
+        self._pos_y = array("d", [0]) * capacity
+        self._frame = array("b", [0]) * capacity
+        self._speed = array("b", [1]) * capacity
+        self._effect = array("b", [0]) * capacity
+
+        # Frame tables are shared by every particle of an effect
+        self._frames = [get_assets().frames(animation) for animation, _layer, _speed in EFFECTS]
+
+        # Particles are drawn in one batch for every sorting layer that the effects use
+        layers = sorted(set(effect[1] for effect in EFFECTS))
+        # Draw keys of every layer and slot, the canvas item of a slot is reused only on the same layer
+        # because an item keeps the stacking of the layer it was created on
+        self._keys = {layer: [(self, layer, i) for i in range(capacity)] for layer in layers}
+        self._batches = [_ParticleBatch(self, layer) for layer in layers]
+        for batch in self._batches:
+            self._renderer.register_batch(batch)
+        self._renderer.register_method(self._update)
+
+    def emit(self, effect, pos_x, pos_y, speed=0):
+        """
+        Spawns a particle
+        :param effect: SHRIMP_PARTICLES, DUST_PARTICLES or STAR_PARTICLES
+        :param pos_x: X position of the particle
+        :param pos_y: Y position of the particle
+        :param speed: Number of frames between animation frames, the default speed of the effect if 0
+        :return: False if the pool is full and the particle is dropped
+        """
+        i = self.count
+        if i >= self.capacity:
+            return False
+        self._pos_x[i] = pos_x
+        self._pos_y[i] = pos_y
+        self._frame[i] = 0
+        self._speed[i] = speed if speed else EFFECTS[effect][2]
+        self._effect[i] = effect
+        self.count += 1
+        return True
 
-        self._sprite = GameSprite(vfx_sprites, layer, pos_x, pos_y)
-        self._renderer.register_object(self._sprite)
-        self._renderer.register_method(self._particle_update)
-        self._renderer.sort_sprites_by_layer()
+    def _update(self, _loop_number):
+        # Goes backwards so the particle that is moved into a dead particle's slot is already updated
+        frame = self._frame
+        speed = self._speed
+        effect = self._effect
+        for i in range(self.count - 1, -1, -1):
+            if _loop_number % speed[i] == 0:
+                if frame[i] < len(self._frames[effect[i]]) - 1:
+                    frame[i] += 1
+                else:
+                    self._kill(i)
 
-    def _particle_update(self, _loop_number):
-        if _loop_number % self.speed == 0:
-            if self._sprite.frame < len(self._sprite.sprites) - 1:
-                self._sprite.frame += 1
-            else:
-                self._renderer.unregister_object(self._sprite)
-                self._renderer.unregister_method(self._particle_update)
+    def _kill(self, i):
+        last = self.count - 1
+        if i != last:
+            self._pos_x[i] = self._pos_x[last]
+            self._pos_y[i] = self._pos_y[last]
+            self._frame[i] = self._frame[last]
+            self._speed[i] = self._speed[last]
+            self._effect[i] = self._effect[last]
+        self.count = last
 
+    def draw_layer(self, draw, layer, offset_x, offset_y):
+        keys = self._keys[layer]
+        for i in range(self.count):
+            effect = self._effect[i]
+            if EFFECTS[effect][1] == layer:
+                pos_x = self._pos_x[i] + offset_x
+                pos_y = self._pos_y[i] + offset_y
+                if abs(pos_x) < 360 and abs(pos_y) < 360:
+                    draw.draw_image(keys[i], layer, self._frames[effect][self._frame[i]], pos_x, pos_y)
 
-class ShrimpParticles(BaseParticle):
-    def __init__(self, renderer, pos_x, pos_y):
-        super().__init__(renderer, pos_x, pos_y, 11, ["vfx_bell_0", "vfx_bell_1", "vfx_bell_2",
-                                                      "vfx_bell_3", "vfx_bell_4", "vfx_bell_5"])
-        self.speed = 2
+    def clear(self):
+        self.count = 0
 
+    def destroy_yourself(self):
+        self._renderer.unregister_method(self._update)
+        for batch in self._batches:
+            self._renderer.unregister_batch(batch, self._keys[batch.layer])
 
-class DustParticles(BaseParticle):
-    def __init__(self, renderer, pos_x, pos_y):
-        super().__init__(renderer, pos_x, pos_y, 9, ["vfx_dust_0", "vfx_dust_1", "vfx_dust_2", "vfx_dust_3"])
-        self.speed = 3
 
+class _ParticleBatch:
+    def __init__(self, particle_system, layer):
+        # Draws the particles of a particle system that are on the same sorting layer
+        self._particle_system = particle_system
+        self.layer = layer
 
-class StarParticles(BaseParticle):
-    def __init__(self, renderer, pos_x, pos_y):
-        super().__init__(renderer, pos_x, pos_y, 9, ["vfx_star_0", "vfx_star_1", "vfx_star_2",
-                                                     "vfx_star_3", "vfx_star_4"])
-        self.speed = 3
+    def draw_batch(self, draw, offset_x, offset_y):
+        self._particle_system.draw_layer(draw, self.layer, offset_x, offset_y)
@@ -0,0 +1,191 @@
+import heapq
+from collections import OrderedDict, deque
+
+from gameManagement import *
+from distanceField import DistanceField, open_neighbours, padded_walls
+
+
+class Pathfinder:
+    def __init__(self, level, max_cached_fields=4):
+        """
+        Shortest paths on a level. The distance field of a target is kept, so the next paths to the same target,
+        e.g. every step of the player towards a shrimp, only walk the field. A field is only searched as far as
+        the paths asked from it need, so a path on a big level costs the area around it. Call invalidate
+        when the level changes
+        :param level: LevelGrid with walls around it
+        :param max_cached_fields: Number of distance fields kept, the least recently used one is dropped
+        """
+        self._level = level
+        self.max_cached_fields = max_cached_fields
+        self._fields = OrderedDict()  # (x, y) of the target -> (DistanceField, distance limit of its search)
+        self._spare_field = None  # Last dropped DistanceField, its buffers are reused by the next target
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._read_level()
+
+    def _read_level(self):
+        self._height = self._level.height
+        self._walls = padded_walls(self._level)
+
+    def invalidate(self):
+        """
+        Forgets the distance fields, call it after a tile of the level is changed
+        """
+        self._fields.clear()
+        self._spare_field = None
+        self._read_level()
+
+    def distance_field(self, x, y, limit=None):
+        """
+        Returns the distance field from the tile at x, y, it is calculated again only if a farther limit is asked
+        :param limit: If given, the tiles farther than this distance may be left undiscovered
+        """
+        entry = self._fields.get((x, y))
+        if entry is not None:
+            field, field_limit = entry
+            if field_limit is None or (limit is not None and limit <= field_limit):
+                self._fields.move_to_end((x, y))
+                self.cache_hits += 1
+                return field
+        elif self._spare_field is not None:
+            field = self._spare_field
+            self._spare_field = None
+        else:
+            field = DistanceField(self._level)
+
+        # A field searched again with a farther limit goes on from where its last search stopped
+        self.cache_misses += 1
+        field.compute(x, y, limit)
+        self._fields[(x, y)] = (field, limit)
+        self._fields.move_to_end((x, y))
+        while len(self._fields) > self.max_cached_fields:
+            self._spare_field = self._fields.popitem(last=False)[1][0]
+        return field
+
+    def shortest_path(self, start, goal):
+        """
+        Returns a shortest path using the cached distance field of the goal. The field is only searched until it
+        reaches the start: its limit starts from the straight distance and grows by 64 tiles until the start is found
+        :param start: (x, y) of the first tile
+        :param goal: (x, y) of the last tile
+        :return: List of (x, y) tiles from start to goal, None if there is no path
+        """
+        limit = max(abs(start[0] - goal[0]) + abs(start[1] - goal[1]), 16)
+        while True:
+            field = self.distance_field(*goal, limit)
+            path = field.path_from(*start)
+            # A search that ended before its limit found every accessible tile, so there is no path
+            if path is not None or field.max_distance < limit:
+                return path
+            limit += 64
+
+    def _neighbours_of(self, b):
+        return open_neighbours(self._walls, self._height, b)
+
+    def _path_to(self, parents, b):
+        path = []
+        while b >= 0:
+            path.append(divmod(b, self._height))
+            b = parents[b]
+        path.reverse()
+        return path
+
+    def bfs_path(self, start, goal):
+        """
+        Returns a shortest path with a breadth-first search that stops at the goal, nothing is cached
+        :return: List of (x, y) tiles from start to goal, None if there is no path
+        """
+        h = self._height
+        source = start[0] * h + start[1]
+        target = goal[0] * h + goal[1]
+        if self._walls[source] == 1 or self._walls[target] == 1:
+            return None
+
+        # Only the discovered tiles are kept, so a short path does not pay for the whole level
+        parents = {source: -1}
+        queue = deque([source])
+        while queue:
+            b = queue.popleft()
+            if b == target:
+                return self._path_to(parents, b)
+            for n in self._neighbours_of(b):
+                if n not in parents:
+                    parents[n] = b
+                    queue.append(n)
+        return None
+
+    def astar_path(self, start, goal):
+        """
+        Returns a shortest path with A* and the Manhattan distance, nothing is cached
+        :return: List of (x, y) tiles from start to goal, None if there is no path
+        """
+        h = self._height
+        source = start[0] * h + start[1]
+        target = goal[0] * h + goal[1]
+        if self._walls[source] == 1 or self._walls[target] == 1:
+            return None
+        goal_x, goal_y = goal
+
+        parents = {source: -1}
+        costs = {source: 0}
+        open_tiles = [(abs(start[0] - goal_x) + abs(start[1] - goal_y), 0, source)]
+        while open_tiles:
+            _estimate, cost, b = heapq.heappop(open_tiles)
+            if b == target:
+                return self._path_to(parents, b)
+            if cost > costs[b]:
+                continue
+            cost += 1
+            for n in self._neighbours_of(b):
+                if cost < costs.get(n, cost + 1):
+                    costs[n] = cost
+                    parents[n] = b
+                    x, y = divmod(n, h)
+                    heapq.heappush(open_tiles, (cost + abs(x - goal_x) + abs(y - goal_y), cost, n))
+        return None
+
+
+class PathHint:
+    def __init__(self, renderer, pathfinder, layer=8):
+        """
+        Draws the shortest path between two tiles, e.g. from the player to the shrimp, as a line of small stars
+        :param renderer: GameRenderer object
+        :param pathfinder: Pathfinder of the level
+        :param layer: Sorting layer of the stars
+        """
+        self._renderer = renderer
+        self._pathfinder = pathfinder
+        self.layer = layer
+        self._shape = get_assets().frames("vfx_star_4")[0]
+        self._path = []
+        self._ends = None
+        self._keys = []  # Draw keys of the stars, the canvas items are reused when the path changes
+        self._registered = False
+
+    def show(self, start, goal):
+        """
+        Shows the path from start to goal, the path is found again only if start or goal has changed
+        """
+        if (start, goal) != self._ends:
+            self._ends = (start, goal)
+            self._path = self._pathfinder.shortest_path(start, goal) or []
+            while len(self._keys) < len(self._path):
+                self._keys.append((self, len(self._keys)))
+        if not self._registered:
+            self._renderer.register_batch(self)
+            self._registered = True
+
+    def hide(self):
+        if self._registered:
+            self._renderer.unregister_batch(self, self._keys)
+            self._registered = False
+
+    def draw_batch(self, draw, offset_x, offset_y):
+        # The first tile is under the player, so it is not drawn
+        keys = self._keys
+        for i in range(1, len(self._path)):
+            x, y = self._path[i]
+            pos_x = x * 64 - 320 + offset_x
+            pos_y = y * 64 - 320 + offset_y
+            if -360 < pos_x < 360 and -360 < pos_y < 360:
+                draw.draw_image(keys[i], self.layer, self._shape, pos_x, pos_y)
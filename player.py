@@ -3,22 +3,30 @@ from gameManagement import *
 
 
 class Player:
-    def __init__(self, renderer, key_input, movement_call):
+    def __init__(self, renderer, key_input, movement_call, particle_system=None):
         """
         Player is controllable by user via keyboard inputs, main actor of gameplay
         :param renderer: GameRenderer object
         :param key_input: KeyboardState object
         :param movement_call: The method that will be called when the player moved
+        :param particle_system: ParticleSystem that the dust particles are spawned in, no dust if None
         """
         self._renderer = renderer
         self._key_input = key_input
         self._movement_call = movement_call
+        self._particles = particle_system
 
-        self.level_data = []
+        self.level_data = None    # LevelGrid of the level
 
-        self.sprite = GameSprite(["turtle_right_0", "turtle_right_1", "turtle_down_0", "turtle_down_1", "turtle_left_0", "turtle_left_1", "turtle_up_0", "turtle_up_1"], 10, -256, -256)
+        self.sprite = GameSprite("turtle", 10, -256, -256)
         self._renderer.register_object(self.sprite)
         self._movement_route = []   # Route of the character, saved for interpolation of sprite
+        self.max_queued_moves = 3  # Moves that can wait in the route, presses beyond it are dropped
+        self.dropped_moves = 0
+
+        # Sprite position at the last two simulation steps, the drawn position is between them
+        self._sprite_pos = [-256, -256]
+        self._previous_sprite_pos = [-256, -256]
 
         self.pos_x = 0
         self.pos_y = 0
@@ -27,31 +35,58 @@ class Player:
         """
         The update is called every frame
         """
-        if self._key_input.pressed_right:
-            self._move_player(1, 0)
-            self.sprite.frame = 1 - self.sprite.frame % 2
+        # Keys are handled in the order they were pressed
+        for timestamp, key in self._key_input.events:
+            if key == "right":
+                self._move_player(1, 0, timestamp)
+                self.sprite.frame = 1 - self.sprite.frame % 2
 
-        if self._key_input.pressed_left:
-            self._move_player(-1, 0)
-            self.sprite.frame = 5 - self.sprite.frame % 2
+            elif key == "left":
+                self._move_player(-1, 0, timestamp)
+                self.sprite.frame = 5 - self.sprite.frame % 2
 
-        if self._key_input.pressed_up:
-            self._move_player(0, 1)
-            self.sprite.frame = 7 - self.sprite.frame % 2
+            elif key == "up":
+                self._move_player(0, 1, timestamp)
+                self.sprite.frame = 7 - self.sprite.frame % 2
 
-        if self._key_input.pressed_down:
-            self._move_player(0, -1)
-            self.sprite.frame = 3 - self.sprite.frame % 2
+            elif key == "down":
+                self._move_player(0, -1, timestamp)
+                self.sprite.frame = 3 - self.sprite.frame % 2
 
+        self._previous_sprite_pos[0] = self._sprite_pos[0]
+        self._previous_sprite_pos[1] = self._sprite_pos[1]
         self._update_sprite_pos()
-        self._renderer.offset_x = -max(min(self.sprite.pos_x, (len(self.level_data) - 11) * 64), 0)
-        self._renderer.offset_y = -max(min(self.sprite.pos_y, (len(self.level_data[0]) - 11) * 64), 0)
 
-    def _move_player(self, dx, dy):
-        if self.level_data[self.pos_x + dx][self.pos_y + dy] != 1:
+    def set_sprite_position(self, pos_x, pos_y):
+        """
+        Moves the sprite without interpolation
+        """
+        self._sprite_pos = [pos_x, pos_y]
+        self._previous_sprite_pos = [pos_x, pos_y]
+        self.sprite.pos_x = pos_x
+        self.sprite.pos_y = pos_y
+
+    def interpolate(self, alpha):
+        """
+        Called before drawing, places the sprite and the camera between the last two simulation steps
+        :param alpha: Progress from the previous step (0) to the last step (1)
+        """
+        self.sprite.pos_x = self._previous_sprite_pos[0] + (self._sprite_pos[0] - self._previous_sprite_pos[0]) * alpha
+        self.sprite.pos_y = self._previous_sprite_pos[1] + (self._sprite_pos[1] - self._previous_sprite_pos[1]) * alpha
+        self._renderer.offset_x = -max(min(self.sprite.pos_x, (self.level_data.width - 11) * 64), 0)
+        self._renderer.offset_y = -max(min(self.sprite.pos_y, (self.level_data.height - 11) * 64), 0)
+
+    def _move_player(self, dx, dy, timestamp=None):
+        # A held key must not queue more moves than the turtle can walk, so it stops soon after the key is released
+        if len(self._movement_route) >= self.max_queued_moves:
+            self.dropped_moves += 1
+            return
+
+        if self.level_data.tile_at(self.pos_x + dx, self.pos_y + dy) != 1:
             self.pos_x += dx
             self.pos_y += dy
-            self._movement_route.append([self.pos_x * 64 - 320, self.pos_y * 64 - 320, dx * 16, dy * 16, 4])
+            self._movement_route.append([self.pos_x * 64 - 320, self.pos_y * 64 - 320, dx * 16, dy * 16, 4,
+                                         timestamp])
 
             if self._movement_call:
                 self._movement_call()
@@ -59,13 +94,19 @@ class Player:
     def _update_sprite_pos(self):
         # Interpolating the sprite position
         if self._movement_route:
-            particles.DustParticles(self._renderer, self.sprite.pos_x + random.randint(-16, 16),
-                                    self.sprite.pos_y + random.randint(-16, 16))
+            if self._particles:
+                rng = self._particles.rng
+                self._particles.emit(particles.DUST_PARTICLES, self._sprite_pos[0] + rng.randint(-16, 16),
+                                     self._sprite_pos[1] + rng.randint(-16, 16))
+
+            # The time from the key press until the first frame that shows the move is drawn
+            if self._movement_route[0][4] == 4 and self._movement_route[0][5] is not None:
+                self._renderer.measure_until_next_frame("input_latency", self._movement_route[0][5], True)
 
             step = 1 if len(self._movement_route) < 3 else 2
             self._movement_route[0][4] -= step
-            self.sprite.pos_x = self._movement_route[0][0] - self._movement_route[0][2] * self._movement_route[0][4] * step
-            self.sprite.pos_y = self._movement_route[0][1] - self._movement_route[0][3] * self._movement_route[0][4] * step
+            self._sprite_pos[0] = self._movement_route[0][0] - self._movement_route[0][2] * self._movement_route[0][4] * step
+            self._sprite_pos[1] = self._movement_route[0][1] - self._movement_route[0][3] * self._movement_route[0][4] * step
 
             if self._movement_route[0][4] < 1:
                 self._movement_route.pop(0)
@@ -0,0 +1,354 @@
+import base64
+import bisect
+import functools
+import math
+import time
+import turtle
+
+
+class TurtleBackend:
+    def __init__(self):
+        """
+        Window, clock, images and keyboard of the game on top of the turtle module and Tk
+        """
+        self._screen = None
+        self._turtleObject = None
+
+    def open_window(self, title, width, height, icon_path):
+        self._screen = turtle.Screen()
+        self._screen.setup(width, height, None, None)
+        self._screen.title(title)
+        self._screen._root.resizable(False, False)
+        self._screen._root.iconbitmap(icon_path)
+
+        # Setting up the turtle
+        self._turtleObject = turtle.Turtle()
+        self._turtleObject.hideturtle()
+        self._turtleObject.penup()
+        self._screen.tracer(0, 0)
+
+    def create_draw(self, retained_mode):
+        if retained_mode:
+            return RetainedCanvasDraw(self._screen, self._turtleObject)
+        return TurtleStampDraw(self._screen, self._turtleObject)
+
+    def now(self):
+        """
+        Returns the time of a monotonic clock in milliseconds
+        """
+        return time.perf_counter() * 1000
+
+    def ontimer(self, method, delay):
+        turtle.ontimer(method, delay)
+
+    def mainloop(self):
+        turtle.mainloop()
+
+    def getshapes(self):
+        return turtle.getshapes()
+
+    def register_shape(self, name):
+        turtle.register_shape(name)
+
+    def read_shape(self, name):
+        """
+        Reads a GIF so it can be registered with register_read_shape. Safe to call from any thread
+        """
+        with open(name, "rb") as gif:
+            return base64.b64encode(gif.read())
+
+    def register_read_shape(self, name, data):
+        # Tk objects can only be created on the Tk thread
+        image = turtle.TK.PhotoImage(data=data, master=self._screen.cv)
+        self._screen.register_shape(name, turtle.Shape("image", image))
+
+    def onkey(self, method, key):
+        turtle.onkey(method, key)
+
+    def listen(self):
+        turtle.listen()
+
+    def bgcolor(self, color):
+        self._screen.bgcolor(color)
+
+    def textinput(self, title, prompt):
+        return self._screen.textinput(title, prompt)
+
+
+class TurtleStampDraw:
+    def __init__(self, screen, turtle_object):
+        """
+        Immediate mode drawing, every frame the canvas items are deleted and created again with turtle stamps
+        :param screen: Turtle screen
+        :param turtle_object: Hidden turtle that is used for stamping and writing
+        """
+        self._screen = screen
+        self._turtleObject = turtle_object
+        self._transition = _TransitionOverlay(screen.cv)
+        self._groups = {}  # Group -> (offset x, offset y)
+        self.operations = 0  # Number of canvas operations in the current frame
+
+    def begin_frame(self):
+        self.operations = 1
+        self._turtleObject.clear()
+        self._transition.begin_frame()
+
+    def move_group(self, group, offset_x, offset_y):
+        self._groups[group] = (offset_x, offset_y)
+
+    def draw_image(self, key, layer, shape_name, pos_x, pos_y, group=None):
+        if group is not None:
+            offset_x, offset_y = self._groups[group]
+            pos_x += offset_x
+            pos_y += offset_y
+            # A stamp costs the same on or off the screen, so the items of a group that are not on it are skipped
+            if not (-360 < pos_x < 360 and -360 < pos_y < 360):
+                return
+        self._turtleObject.shape(shape_name)
+        self._turtleObject.setposition(pos_x, pos_y)
+        self._turtleObject.stamp()
+        self.operations += 3
+
+    def draw_text(self, key, content, color, font, align, pos_x, pos_y):
+        self._turtleObject.pencolor(color)
+        self._turtleObject.setposition(pos_x, pos_y)
+        self._turtleObject.write(content, False, align, font)
+        self.operations += 2
+
+    def draw_transition(self, radius):
+        # The stamps of this frame are newer than the overlay, so it is raised over them
+        self.operations += self._transition.draw(radius, raise_item=True)
+
+    def end_frame(self):
+        self.operations += self._transition.end_frame()
+
+    def forget(self, key):
+        self._groups.pop(key, None)
+
+
+class RetainedCanvasDraw:
+    def __init__(self, screen, turtle_object):
+        """
+        Retained mode drawing, keeps one canvas item for every drawn object and only changes it
+        when its position, image, text or visibility changes
+        :param screen: Turtle screen
+        :param turtle_object: Hidden turtle of the screen
+        """
+        self._screen = screen
+        self._turtleObject = turtle_object
+        self._canvas = screen.cv
+        self._items = {}  # key -> [item, state of the last draw]
+        self._groups = {}  # Group -> [canvas tag, offset x, offset y]
+        self._shown = set()  # Keys of the items that are visible on the canvas
+        self._drawn = set()  # Keys drawn in the current frame
+        self.operations = 0  # Number of canvas operations in the current frame
+
+        # Hidden marker items keep the stacking order. Items of a layer are kept right under the marker of the layer,
+        # so a new item comes on top of the older items of its layer. Texts are under the text marker
+        self._layers = []
+        self._layer_markers = []
+        self._text_marker = self._create_marker()
+
+        # The overlay is created after the text marker, so it stays over every item
+        self._transition = _TransitionOverlay(self._canvas)
+
+    def _create_marker(self):
+        return self._canvas.create_text(0, 0, text="", state="hidden")
+
+    def _marker_of(self, layer):
+        i = bisect.bisect_left(self._layers, layer)
+        if i < len(self._layers) and self._layers[i] == layer:
+            return self._layer_markers[i]
+
+        marker = self._create_marker()
+        above = self._layer_markers[i] if i < len(self._layer_markers) else self._text_marker
+        self._canvas.tag_lower(marker, above)
+        self._layers.insert(i, layer)
+        self._layer_markers.insert(i, marker)
+        return marker
+
+    def begin_frame(self):
+        self.operations = 0
+        self._drawn = set()
+        self._transition.begin_frame()
+
+    def move_group(self, group, offset_x, offset_y):
+        """
+        Sets the offset of a group of items, e.g. the tiles when the camera scrolls. Every item of the group is moved
+        with one canvas operation, so only the items that change themselves cost more
+        :param group: Object that owns the group
+        """
+        entry = self._groups.get(group)
+        if entry is None:
+            self._groups[group] = [f"group_{id(group)}", offset_x, offset_y]
+            return
+        tag, last_x, last_y = entry
+        if last_x != offset_x or last_y != offset_y:
+            self._canvas.move(tag, offset_x - last_x, last_y - offset_y)
+            entry[1] = offset_x
+            entry[2] = offset_y
+            self.operations += 1
+
+    def draw_image(self, key, layer, shape_name, pos_x, pos_y, group=None):
+        """
+        :param key: Object that owns the item
+        :param layer: Sorting layer, None puts the item under everything
+        :param shape_name: Name of a registered image shape
+        :param group: Group of move_group, the position is relative to the offset of the group
+        """
+        image = self._screen._shapes[shape_name]._data
+        entry = self._items.get(key)
+        if group is None:
+            tags = ()
+            canvas_x, canvas_y = pos_x, -pos_y
+        else:
+            tag, offset_x, offset_y = self._groups[group]
+            tags = (tag,)
+            canvas_x, canvas_y = pos_x + offset_x, -pos_y - offset_y
+        if entry is None:
+            item = self._canvas.create_image(canvas_x, canvas_y, image=image, tags=tags)
+            if layer is None:
+                self._canvas.tag_lower(item)
+            else:
+                self._canvas.tag_lower(item, self._marker_of(layer))
+            self._items[key] = [item, (image, pos_x, pos_y)]
+            self.operations += 2
+        else:
+            item, (last_image, last_x, last_y) = entry
+            if last_x != pos_x or last_y != pos_y:
+                self._canvas.coords(item, canvas_x, canvas_y)
+                self.operations += 1
+            if last_image is not image:
+                self._canvas.itemconfig(item, image=image)
+                self.operations += 1
+            entry[1] = (image, pos_x, pos_y)
+            if key not in self._shown:
+                self._canvas.itemconfig(item, state="normal")
+                self.operations += 1
+
+        self._shown.add(key)
+        self._drawn.add(key)
+
+    def draw_text(self, key, content, color, font, align, pos_x, pos_y):
+        state = (content, color, font, align)
+        entry = self._items.get(key)
+        if entry is None:
+            item = self._canvas.create_text(pos_x - 1, -pos_y, text=content, anchor=_TEXT_ANCHORS[align],
+                                            fill=color, font=font)
+            self._canvas.tag_lower(item, self._text_marker)
+            self._items[key] = [item, (state, pos_x, pos_y)]
+            self.operations += 2
+        else:
+            item, (last_state, last_x, last_y) = entry
+            if last_x != pos_x or last_y != pos_y:
+                self._canvas.coords(item, pos_x - 1, -pos_y)
+                self.operations += 1
+            if last_state != state:
+                self._canvas.itemconfig(item, text=content, anchor=_TEXT_ANCHORS[align], fill=color, font=font)
+                self.operations += 1
+            entry[1] = (state, pos_x, pos_y)
+            if key not in self._shown:
+                self._canvas.itemconfig(item, state="normal")
+                self.operations += 1
+
+        self._shown.add(key)
+        self._drawn.add(key)
+
+    def draw_transition(self, radius):
+        self.operations += self._transition.draw(radius)
+
+    def end_frame(self):
+        # Hides the items that were not drawn in this frame
+        for key in self._shown - self._drawn:
+            self._canvas.itemconfig(self._items[key][0], state="hidden")
+            self.operations += 1
+        self._shown = self._drawn
+        self.operations += self._transition.end_frame()
+
+    def forget(self, key):
+        """
+        Deletes the item of an object that is not going to be drawn again
+        """
+        self._groups.pop(key, None)
+        entry = self._items.pop(key, None)
+        if entry is not None:
+            self._canvas.delete(entry[0])
+            self._shown.discard(key)
+            self._drawn.discard(key)
+            self.operations += 1
+
+
+class _TransitionOverlay:
+    def __init__(self, canvas):
+        """
+        Black screen with a circular hole in it for transitions. It is a single polygon item that is
+        only moved to the outline of the new radius, so a frame of a transition costs at most three canvas operations
+        :param canvas: Tk canvas of the screen
+        """
+        self._canvas = canvas
+        self._item = None
+        self._radius = None  # Radius of the current outline
+        self._shown = False
+        self._drawn = False
+
+    def begin_frame(self):
+        self._drawn = False
+
+    def draw(self, radius, raise_item=False):
+        """
+        Shows the overlay, returns the number of canvas operations
+        :param radius: Transition radius of the renderer
+        :param raise_item: If True, the overlay is raised over the items made after it
+        """
+        # The hole is a little smaller than the radius, like the inner edge of the old 64 pixel wide rings
+        hole_radius = max(0, radius - 32)
+        if hole_radius >= _TRANSITION_CLEAR_RADIUS:
+            return 0
+        self._drawn = True
+
+        operations = 0
+        if self._item is None:
+            self._item = self._canvas.create_polygon(*_transition_outline(hole_radius), fill="black", outline="")
+            self._radius = hole_radius
+            operations += 1
+        elif hole_radius != self._radius:
+            self._canvas.coords(self._item, *_transition_outline(hole_radius))
+            self._radius = hole_radius
+            operations += 1
+        if not self._shown:
+            self._canvas.itemconfig(self._item, state="normal")
+            self._shown = True
+            operations += 1
+        if raise_item:
+            self._canvas.tag_raise(self._item)
+            operations += 1
+        return operations
+
+    def end_frame(self):
+        # Hides the overlay if it was not drawn in this frame, returns the number of canvas operations
+        if self._shown and not self._drawn:
+            self._canvas.itemconfig(self._item, state="hidden")
+            self._shown = False
+            return 1
+        return 0
+
+
+@functools.lru_cache(maxsize=128)
+def _transition_outline(hole_radius):
+    # Canvas coordinates of a square bigger than the screen with a circular hole in it. The square goes
+    # counterclockwise and the circle clockwise, joined by a cut of zero width, so the circle is left empty.
+    # A transition uses the same few dozen radii every time, so they are calculated once
+    size = _TRANSITION_SQUARE_SIZE
+    points = [size, 0, size, -size, -size, -size, -size, size, size, size, size, 0]
+    for cos, sin in _TRANSITION_CIRCLE:
+        points.append(cos * hole_radius)
+        points.append(sin * hole_radius)
+    return tuple(points)
+
+
+_TRANSITION_SQUARE_SIZE = 400  # Half of the width of the overlay, the screen is 640 pixels wide
+_TRANSITION_CLEAR_RADIUS = math.ceil(math.hypot(320, 320))  # A hole this big shows the whole screen
+# Points of a unit circle in canvas coordinates, y goes down on the canvas so the angles go clockwise on the screen
+_TRANSITION_CIRCLE = tuple((math.cos(math.pi * t / 32), math.sin(math.pi * t / 32)) for t in range(65))
+
+_TEXT_ANCHORS = {"left": "sw", "center": "s", "right": "se"}
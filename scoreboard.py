@@ -20,24 +20,19 @@ class ScoreboardScreen:
 
         self._wave = GameSprite(["mainmenu_wave"], 0, 0, 80)
         self._renderer.register_object(self._wave)
-        self._background = GameSprite(["scoreboard_bg_0", "scoreboard_bg_1"], 0, 0, -160)
+        self._background = GameSprite("scoreboard_bg", 0, 0, -160)
         self._renderer.register_object(self._background)
 
         SceneTransition(self._renderer).entrance_transition()
 
         sb = Scoreboard()
 
-        ask_for_name = False
-        if len(sb.get_scores()) < 7:
-            ask_for_name = True
-        elif game_variables[2] > sb.get_scores()[-1][1]:
-            ask_for_name = True
-        if ask_for_name:
+        if sb.would_place(game_variables[2]):
             name = renderer.get_text_input("You Win!" if player_succeed else "Time's Up!", "Please Enter Your Name:")
             if name:
                 sb.add_score(name, game_variables[2])
                 sb.update_score_data()
-        turtle.listen()
+        get_backend().listen()
 
         scores = sb.get_scores()
         press_enter_text = UiText("Press Enter to Return", "black", "Times New Roman", 24, "italic", "center", 0, -210)
@@ -56,7 +51,7 @@ class ScoreboardScreen:
         self._renderer.register_method(self._scoreboard_update)
 
         self._can_return = False
-        turtle.ontimer(self._enable_returning, 500)
+        get_backend().ontimer(self._enable_returning, 500)
 
     def _scoreboard_update(self, _loop_number):
         self._wave.pos_x = (_loop_number % 64) * 2.5 - 80
@@ -0,0 +1,83 @@
+from array import array
+
+from distanceField import DistanceField
+
+
+class ShrimpSchedule:
+    def __init__(self, start_x, start_y, creation_range, shrimps):
+        """
+        Every shrimp of a level in the order they are collected, planned before the level starts.
+        A shrimp is collected by standing on it, so the next shrimp is always placed from the tile of the last one
+        :param start_x: X position of the player at the start of the level
+        :param start_y: Y position of the player at the start of the level
+        :param creation_range: Shrimp creation range of the level
+        :param shrimps: List of (x, y, score value) tuples
+        """
+        self.start_x = start_x
+        self.start_y = start_y
+        self.creation_range = creation_range
+        self.shrimps = shrimps
+
+    def __len__(self):
+        return len(self.shrimps)
+
+    def __getitem__(self, i):
+        return self.shrimps[i]
+
+    def matches(self, start_x, start_y, creation_range):
+        return (self.start_x, self.start_y, self.creation_range) == (start_x, start_y, creation_range)
+
+    def to_bytes(self):
+        values = array("i", [self.start_x, self.start_y, self.creation_range])
+        for shrimp in self.shrimps:
+            values.extend(shrimp)
+        return values.tobytes()
+
+
+def schedule_from_bytes(data):
+    """
+    Reads a schedule saved with ShrimpSchedule.to_bytes
+    """
+    values = array("i")
+    values.frombytes(data)
+    shrimps = [tuple(values[i:i + 3]) for i in range(3, len(values), 3)]
+    return ShrimpSchedule(values[0], values[1], values[2], shrimps)
+
+
+def plan_shrimp_schedule(level, start_x, start_y, creation_range, rng, distance_field=None):
+    """
+    Places every shrimp of a level with the rules of the game: the walking distance of a shrimp is between
+    half and all of the remaining creation range, its score is (distance - 1) * 4 and the distance is taken
+    from the range. Distances count the player's tile as 1
+    :param level: LevelGrid of the level
+    :param start_x: X position of the player at the start of the level
+    :param start_y: Y position of the player at the start of the level
+    :param creation_range: Shrimp creation range of the level
+    :param rng: Random number generator of the shrimps
+    :param distance_field: DistanceField of the level to reuse, a new one is made if None
+    :return: ShrimpSchedule
+    """
+    if distance_field is None:
+        distance_field = DistanceField(level)
+    shrimps = []
+    pos_x, pos_y = start_x, start_y
+    remaining_range = creation_range
+    while True:
+        # Tiles farther than the remaining creation range can never be picked, so the search stops there
+        distance_field.compute(pos_x, pos_y, remaining_range)
+        max_dist = min(distance_field.max_distance + 1, remaining_range + 1)
+        if max(2, max_dist // 2) < max_dist:
+            desired_shrimp_distance = rng.randint(max(2, max_dist // 2), max_dist)
+        else:
+            desired_shrimp_distance = 2
+        tile = distance_field.pick_tile_at(desired_shrimp_distance - 1, rng)
+        if tile is None:
+            break
+        pos_x, pos_y = tile
+        shrimps.append((pos_x, pos_y, (desired_shrimp_distance - 1) * 4))
+
+        # The level ends when the range is spent
+        remaining_range -= desired_shrimp_distance - 1
+        if remaining_range <= 0:
+            break
+    return ShrimpSchedule(start_x, start_y, creation_range, shrimps)
@@ -0,0 +1,71 @@
+import math
+
+from gameManagement import *
+
+
+class TileView:
+    def __init__(self, renderer, tile_shape, size=13):
+        """
+        Fixed pool of tile sprites that covers the screen. As the camera moves, the sprites of the tiles that
+        leave the screen are moved to the tiles that come in, so the number of sprites never depends on the level size.
+        The tile at x, y always uses the sprite at (x % size, y % size), so only the new row or column is changed.
+        The pool is drawn as one batch under the other sprites. Its items are a group of the draw, so scrolling
+        moves all of them with one canvas operation and only the rebound sprites change their items
+        :param renderer: GameRenderer object
+        :param tile_shape: Function that returns the asset name of the tile at x, y, or None if there is no tile
+        :param size: Width and height of the pool in tiles, it must be bigger than the screen
+        """
+        self._renderer = renderer
+        self._tile_shape = tile_shape
+        self._size = size
+        self._assets = get_assets()
+        self.layer = -1
+
+        slot_count = size * size
+        self._bound_tiles = [None] * slot_count  # (x, y) of the tile that each sprite shows
+        self._shapes = [None] * slot_count  # Shape name of each sprite, None is hidden
+        self._pos_x = [0] * slot_count
+        self._pos_y = [0] * slot_count
+        self._keys = [(self, i) for i in range(slot_count)]  # Draw keys, the canvas item of a sprite is reused
+
+        self._first_tile = None
+        self.rebound_tiles = 0  # Number of times a sprite was moved to another tile
+        self._renderer.register_batch(self)
+
+    def refresh(self, _alpha=0):
+        """
+        Moves the sprites to the tiles around the camera, register it as a draw method after the camera is placed
+        """
+        # The tile at x is drawn at x * 64 - 320, the screen is 640 pixels wide and a tile is 64 pixels wide
+        first_x = math.floor((-self._renderer.offset_x - 32) / 64)
+        first_y = math.floor((-self._renderer.offset_y - 32) / 64)
+        if (first_x, first_y) == self._first_tile:
+            return
+        self._first_tile = (first_x, first_y)
+
+        size = self._size
+        for x in range(first_x, first_x + size):
+            column = (x % size) * size
+            for y in range(first_y, first_y + size):
+                i = column + y % size
+                if self._bound_tiles[i] != (x, y):
+                    self._bind(i, x, y)
+
+    def _bind(self, i, x, y):
+        self._bound_tiles[i] = (x, y)
+        self.rebound_tiles += 1
+        shape = self._tile_shape(x, y)
+        self._shapes[i] = self._assets.frames(shape)[0] if shape is not None else None
+        self._pos_x[i] = x * 64 - 320
+        self._pos_y[i] = y * 64 - 320
+
+    def draw_batch(self, draw, offset_x, offset_y):
+        draw.move_group(self, offset_x, offset_y)
+        shapes = self._shapes
+        keys = self._keys
+        for i in range(len(shapes)):
+            if shapes[i] is not None:
+                draw.draw_image(keys[i], -1, shapes[i], self._pos_x[i], self._pos_y[i], self)
+
+    def destroy_yourself(self):
+        self._renderer.unregister_batch(self, self._keys + [self])